@@ -2,42 +2,36 @@ import asyncio
 import socket
 import struct
 from dataclasses import dataclass
-from enum import Enum
 from sys import stdout
 from typing import AsyncGenerator
 
-from fastsocket import get_ip
+from fastsocket import get_ip, timeseries_backend
 
 HOST = "::"
 PORT = 6969
 CHUNK_SIZE = 4096
+TIMESERIES_BACKEND = "python"  # "numpy" answers each burst of queries in one pass
 
+TimeSeries = timeseries_backend(TIMESERIES_BACKEND)
 
-class RequestType(Enum):
+
+class RequestType:
     INSERT = b"I"
     QUERY = b"Q"
 
 
-@dataclass
-class Request:
-    # ! = network byte order, c = char, i = int
-    FORMAT = "!cii"
-    SIZE = struct.calcsize(FORMAT)
+# requests stay the (type, first, second) tuples struct.iter_unpack makes
+Request = tuple[bytes, int, int]
+REQUEST = struct.Struct("!cii")  # ! = network byte order, c = char, i = int
 
-    type: RequestType
-    first: int
-    second: int
 
-    @classmethod
-    def from_bytes(cls, data: bytes) -> "Request":
-        if len(data) != cls.SIZE:
-            raise ValueError("Invalid message size")
-        raw_type, first, second = struct.unpack(cls.FORMAT, data)
-        try:
-            msg_type = RequestType(raw_type)
-        except ValueError:
-            raise ValueError(f"Unknown message type: {raw_type!r}")
-        return cls(msg_type, first, second)
+def decode_requests(buffer: bytearray) -> list[Request]:
+    """Decode every complete request in buffer, the partial tail stays in it."""
+    end = len(buffer) - len(buffer) % REQUEST.size
+    with memoryview(buffer) as view, view[:end] as frames:
+        requests = list(REQUEST.iter_unpack(frames))
+    del buffer[:end]  # moves the start of the bytearray, the tail isn't copied
+    return requests
 
 
 @dataclass
@@ -51,46 +45,51 @@ class Response:
         return struct.pack(self.FORMAT, self.value)
 
 
-async def parse_requests(reader: asyncio.StreamReader) -> AsyncGenerator[Request]:
-    data = bytes()
+async def parse_requests(
+    reader: asyncio.StreamReader,
+) -> AsyncGenerator[list[Request]]:
+    """Yields the complete requests of every chunk read, together."""
+    buffer = bytearray()
     while True:
         chunk = await reader.read(CHUNK_SIZE)
         if not chunk:
             break
-        data += chunk
-
-        while len(data) >= Request.SIZE:
-            request_bytes = data[: Request.SIZE]
-            try:
-                yield Request.from_bytes(request_bytes)
-            except ValueError:
-                print(f"Bad Request: {request_bytes.hex()}")
-            data = data[Request.SIZE :]
+        buffer += chunk
+        yield decode_requests(buffer)
 
 
 async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
     print = stdout.write
     addr = writer.get_extra_info("peername")
     print(f"Connection from {addr}\n")
-    store = {}
-
-    async for request in parse_requests(reader):
-        print(f"<-- {request.type} {request.first} {request.second}\n")
-        match request.type:
-            case RequestType.INSERT:
-                timestamp, price = request.first, request.second
-                store[timestamp] = price
-            case RequestType.QUERY:
-                mintime, maxtime = request.first, request.second
-                total = count = 0
-                for timestamp, price in store.items():
-                    if mintime <= timestamp <= maxtime:
-                        total += price
-                        count += 1
-                mean = int(total / count if count else 0)
-                print(f"--> {mean}\n")
-                writer.write(Response(value=mean).to_bytes())
-                await writer.drain()
+    store = TimeSeries()
+
+    def answer(ranges: list[tuple[int, int]]):
+        # consecutive queries see the same points, so they go to the store at once
+        writer.writelines(
+            [Response(value=mean).to_bytes() for mean in store.means(ranges)]
+        )
+        ranges.clear()
+
+    async for requests in parse_requests(reader):
+        ranges: list[tuple[int, int]] = []
+        wrote = False  # queries answered ahead of an insert count too
+        for request_type, first, second in requests:
+            match request_type:
+                case RequestType.INSERT:
+                    if ranges:
+                        answer(ranges)
+                        wrote = True
+                    store.insert(first, second)
+                case RequestType.QUERY:
+                    ranges.append((first, second))
+                case _:
+                    print(f"Bad Request: {request_type!r}\n")
+        if ranges:
+            answer(ranges)
+            wrote = True
+        if wrote:
+            await writer.drain()
 
     print(f"Closed connection from {addr}\n")
     writer.close()
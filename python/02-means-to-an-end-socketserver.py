@@ -4,16 +4,19 @@ import struct
 from sys import stdout
 from typing import Generator
 
-from fastsocket import get_ip
+from fastsocket import get_ip, timeseries_backend
 
 HOST = "::"
 PORT = 6969
 CHUNK_SIZE = 4096
+TIMESERIES_BACKEND = "python"  # or "numpy", falls back to "python" without NumPy
 
 INCOMING_MESSAGE_FORMAT = "!cii"  # ! = network byte order, c = char, i = int
 OUTGOING_MESSAGE_FORMAT = "!i"
 INCOMING_MESSAGE_SIZE = struct.calcsize(INCOMING_MESSAGE_FORMAT)
 
+TimeSeries = timeseries_backend(TIMESERIES_BACKEND)
+
 
 class MessageType:
     INSERT = b"I"
@@ -23,7 +26,7 @@ class MessageType:
 class TimeseriesDatabaseServer(socketserver.BaseRequestHandler):
     def setup(self) -> None:
         stdout.write(f"Connected from {self.client_address}\n")
-        self.db = {}
+        self.db = TimeSeries()
 
     def handle(self) -> None:
         for message in self.read_messages():
@@ -36,15 +39,10 @@ class TimeseriesDatabaseServer(socketserver.BaseRequestHandler):
                     self.handle_query(num1, num2)
 
     def handle_insert(self, timestamp: int, price: int) -> None:
-        self.db[timestamp] = price
+        self.db.insert(timestamp, price)
 
     def handle_query(self, mintime: int, maxtime: int) -> None:
-        total = count = 0
-        for timestamp, price in self.db.items():
-            if mintime <= timestamp <= maxtime:
-                total += price
-                count += 1
-        mean = int(total / count if count else 0)
+        mean = self.db.mean(mintime, maxtime)
         stdout.write(f"--> {mean}\n")
         self.request.sendall(struct.pack(OUTGOING_MESSAGE_FORMAT, mean))
 
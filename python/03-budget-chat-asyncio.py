@@ -0,0 +1,37 @@
+import asyncio
+import socket
+
+from fastsocket import get_ip
+from fastsocket.chat import Hub
+
+HOST = "::"
+PORT = 6969
+SHARDS = None  # shard processes serving the rooms, one per CPU by default
+SLOW_CONSUMER = "disconnect"  # or "drop", for clients whose outbox is full
+
+
+# A client answering the welcome with `room/name` joins that room, a bare `name`
+# joins the default one, all the original protocol knows. See fastsocket/chat.py
+async def main(hub: Hub):
+    # Create a dual-stack socket that listens on all interfaces.
+    sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+    sock.setblocking(False)
+    sock.bind((HOST, PORT))
+    sock.listen()
+
+    print(f"Listening on {PORT} at")
+    for ip in get_ip():
+        print(f"  => {ip}")
+
+    await hub.serve(sock)
+
+
+if __name__ == "__main__":
+    hub = Hub(shards=SHARDS, slow_consumer=SLOW_CONSUMER)
+    hub.start()  # fork the shards before there is an event loop to inherit
+    try:
+        asyncio.run(main(hub))
+    except KeyboardInterrupt:
+        print("bye.")
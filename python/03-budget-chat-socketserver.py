@@ -1,14 +1,17 @@
 import socket
 import socketserver
+from collections import deque
 from dataclasses import dataclass
 from typing import Generator
 from uuid import UUID, uuid4
 
 from fastsocket import get_ip
+from fastsocket.framing import LineFramer
 
 HOST = "::"
 PORT = 6969
 CHUNK_SIZE = 4096
+MAX_LINE = 4 * 1000 + 24  # bytes, 1000 characters are up to 4000 in UTF-8
 
 
 @dataclass(eq=True, frozen=True, unsafe_hash=True)
@@ -21,10 +24,11 @@ class User:
 class BudgetChatServer(socketserver.BaseRequestHandler):
     user: User
     users: list[User] = []
-    data: str = ""
 
     def setup(self) -> None:
         print("Connected from", self.client_address)
+        self.framer = LineFramer(MAX_LINE)
+        self.lines: deque[bytes] = deque()  # framed, not handled yet
 
         # Welcome message, ask for name
         self.request.sendall(b"Welcome to budgetchat! What shall I call you?\n")
@@ -54,25 +58,25 @@ class BudgetChatServer(socketserver.BaseRequestHandler):
             print(f"<-- [{self.user.name}] {message}")
             self.broadcast(f"[{self.user.name}] {message}")
 
-    def read_messages(self, delimiter: str = "\n") -> Generator[str]:
+    def read_messages(self) -> Generator[str]:
         while True:
             try:
-                message = self.read_message(delimiter)
-            except OSError:  # socket closed
+                message = self.read_message()
+            except (OSError, ValueError):  # socket closed, line too long, not utf-8
                 return
             if message is None:  # client disconnected
                 break
             yield message
 
-    def read_message(self, delimiter: str = "\n") -> str | None:
-        while delimiter not in self.data:
-            chunk = self.request.recv(CHUNK_SIZE).decode("utf-8")
+    def read_message(self) -> str | None:
+        while not self.lines:
+            chunk = self.request.recv(CHUNK_SIZE)
             if not chunk:  # client disconnected
                 return None
-            self.data += chunk
+            self.lines.extend(self.framer.feed(chunk))
 
-        message, _, self.data = self.data.partition(delimiter)
-        return message.strip()
+        # framed as bytes, a multi-byte character split over two reads is fine
+        return self.lines.popleft().decode("utf-8").strip()
 
     def broadcast(self, message: str):
         encoded_message = (message + "\n").encode()
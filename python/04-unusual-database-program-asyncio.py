@@ -0,0 +1,114 @@
+import asyncio
+import socket
+
+from fastsocket import get_ip
+from fastsocket.kvstore import KVStore, compact_log
+
+HOST = "::"
+PORT = 6969
+MAX_PACKET_SIZE = 1000
+STORE_PATH = None  # append-only log to recover from on restart, e.g. "kv.log"
+MEMORY_BUDGET = None  # bytes, least recently used keys are evicted past it
+FLUSH_INTERVAL = 1.0  # seconds between log flushes and compaction checks
+
+VERSION = b"Advik's UDP KV Store v0.2"
+IMMUTABLE = {b"version": VERSION}  # kept out of the store, never evicted
+
+
+class KeyValueStoreProtocol(asyncio.DatagramProtocol):
+    """
+    Every datagram is handled inline, right in datagram_received: no thread, no
+    task and no log line per packet. Keys and values stay bytes, so nothing is
+    decoded either. One event loop owns the store, so it needs no lock.
+    """
+
+    def __init__(self, store: KVStore | None = None):
+        self.store = store if store is not None else KVStore()
+        self.transport: asyncio.DatagramTransport | None = None
+        self.timer: asyncio.TimerHandle | None = None
+        self.compaction: asyncio.Task | None = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+        if self.store.log is not None:
+            self.timer = asyncio.get_running_loop().call_later(
+                FLUSH_INTERVAL, self.flush
+            )
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.compaction is not None:
+            self.compaction.cancel()
+        self.store.close()
+
+    def flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.store.flush()
+        if self.compaction is None and self.store.should_compact():
+            self.compaction = loop.create_task(self.compact())
+        self.timer = loop.call_later(FLUSH_INTERVAL, self.flush)
+
+    async def compact(self) -> None:
+        # rewriting the log takes seconds, keep answering packets meanwhile
+        store = self.store
+        size = store.start_compaction()
+        try:
+            size = await asyncio.to_thread(
+                compact_log, store.path, size, store.max_bytes
+            )
+        except OSError as e:
+            print(f"Compaction failed: {e!r}")
+            store.cancel_compaction()
+        else:
+            store.finish_compaction(size)
+        finally:
+            self.compaction = None
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if len(data) >= MAX_PACKET_SIZE:
+            return
+
+        key, equals, value = data.partition(b"=")
+        # Insert
+        if equals:
+            if key not in IMMUTABLE:
+                self.store.set(key, value)
+
+        # Retrieve
+        else:
+            value = IMMUTABLE.get(key) or self.store.get(key, b"")
+            self.transport.sendto(key + b"=" + value, addr)
+
+
+async def main():
+    # Create a dual-stack socket that listens on all interfaces.
+    sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+    sock.setblocking(False)
+    sock.bind((HOST, PORT))
+
+    print(f"Listening on {PORT} at")
+    for ip in get_ip():
+        print(f"  => {ip}")
+
+    store = KVStore(STORE_PATH, MEMORY_BUDGET)
+    if STORE_PATH:
+        print(f"Recovered {len(store):,} keys from {STORE_PATH}")
+
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: KeyValueStoreProtocol(store), sock=sock
+    )
+    try:
+        await asyncio.Future()  # serve forever
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("bye.")
@@ -1,17 +1,28 @@
 import asyncio
 import re
 import socket
-from typing import AsyncGenerator, Awaitable, Callable
+from typing import AsyncGenerator, Callable
 
 from fastsocket import get_ip
+from fastsocket.framing import LineFramer
+from fastsocket.rewrite import Rewriter, Rule
+from fastsocket.upstream import Upstream
 
 HOST = "::"
 PORT = 6969
 UPSTREAM_SERVER = ("chat.protohackers.com", 16963)
+UPSTREAM_LIMIT = 512  # connections open to it at once, pre-dialed ones included
+CONNECT_TIMEOUT = 5.0
 CHUNK_SIZE = 4096
+MAX_LINE = 64 * 1024  # Budget Chat needs 1000 characters, a line past this ends it
 MESSAGE_SEPARATOR = b"\n"
-BOGUSCOIN_RE = re.compile(r"(^|\s)7[a-zA-Z0-9]{25,34}(?=\s|$)")
-TONY_ADDRESS = "7YWHMfk9JZe0LM0g1ZauHuiSxhI"
+BOGUSCOIN_RE = re.compile(rb"(^|\s)7[a-zA-Z0-9]{25,34}(?=\s|$)")
+TONY_ADDRESS = b"7YWHMfk9JZe0LM0g1ZauHuiSxhI"
+
+# every Boguscoin address starts with a 7, lines without one skip the regex
+transform = Rewriter([Rule(BOGUSCOIN_RE, lambda m: m[1] + TONY_ADDRESS, guard=b"7")])
+# sessions take a pre-dialed connection, no DNS or handshake before the first byte
+upstream = Upstream(*UPSTREAM_SERVER, UPSTREAM_LIMIT, connect_timeout=CONNECT_TIMEOUT)
 
 
 async def handle(
@@ -21,11 +32,11 @@ async def handle(
     addr = client_writer.get_extra_info("peername")[0]
     print(f"Client Connected: {addr}")
 
-    upstream_reader, upstream_writer = await asyncio.open_connection(*UPSTREAM_SERVER)
-    await asyncio.gather(
-        forward(client_reader, upstream_writer, transform, "client -> server"),
-        forward(upstream_reader, client_writer, transform, "server -> client"),
-    )
+    async with upstream.connection() as (upstream_reader, upstream_writer):
+        await asyncio.gather(
+            forward(client_reader, upstream_writer, transform, "client -> server"),
+            forward(upstream_reader, client_writer, transform, "server -> client"),
+        )
 
     print(f"Client Disconnected: {addr}")
     client_writer.close()
@@ -35,14 +46,14 @@ async def handle(
 async def forward(
     reader: asyncio.StreamReader,
     writer: asyncio.StreamWriter,
-    transform: Callable[[bytes], Awaitable[bytes]],
+    transform: Callable[[bytes], bytes],
     label: str,
 ):
     try:
-        async for request in parse_requests(reader):
-            print(f"{label}: {request}")
-            writer.write(await transform(request))
-            writer.write(b"\n")
+        async for requests in parse_requests(reader):
+            for request in requests:
+                print(f"{label}: {request}")
+            writer.write(b"\n".join(map(transform, requests)) + b"\n")
             await writer.drain()
     except Exception:
         pass
@@ -51,21 +62,12 @@ async def forward(
     await writer.wait_closed()
 
 
-async def transform(text: bytes) -> bytes:
-    return BOGUSCOIN_RE.sub(lambda m: m.group(1) + TONY_ADDRESS, text.decode()).encode()
-
-
-async def parse_requests(reader: asyncio.StreamReader) -> AsyncGenerator[bytes]:
-    data = bytes()
-    while True:
-        chunk = await reader.read(CHUNK_SIZE)
-        if not chunk:
-            break
-        data += chunk
-
-        while MESSAGE_SEPARATOR in data:
-            message, data = data.split(MESSAGE_SEPARATOR)
-            yield message
+async def parse_requests(reader: asyncio.StreamReader) -> AsyncGenerator[list[bytes]]:
+    """Yield the complete lines of every read, in one list per read."""
+    framer = LineFramer(MAX_LINE, MESSAGE_SEPARATOR)
+    while chunk := await reader.read(CHUNK_SIZE):
+        if requests := framer.feed(chunk):
+            yield requests
 
 
 async def main() -> None:
@@ -81,6 +83,7 @@ async def main() -> None:
     for ip in get_ip():
         print(f"  => {ip}")
 
+    upstream.fill()
     server = await asyncio.start_server(handle, sock=sock)
     async with server:
         await server.serve_forever()
@@ -1,8 +1,6 @@
-import asyncio
-from dataclasses import dataclass
-from typing import AsyncGenerator, Literal
-
-from fastsocket import FastTCP, Struct, u8, u16, u32
+from fastsocket import Connection, FastTCP, Struct, u8, u16, u32
+from fastsocket.speed import SpeedTracker, TicketRouter
+from fastsocket.timers import Timer, TimerWheel
 
 
 # Input Message Types
@@ -30,8 +28,7 @@ class IAmCamera(Struct):
 class IAmDispatcher(Struct):
     message_type: u8 = u8(0x81)
 
-    numroads: u8
-    roads: list[u16]  # (array of u16)
+    roads: list[u16]  # (array of u16, prefixed by numroads: u8)
 
 
 # Output Message Types
@@ -59,44 +56,97 @@ class Heartbeat(Struct):
     pass
 
 
-@dataclass
-class Client:
-    type: Literal["camera", "dispatcher"]
+class Client(Connection):
+    __slots__ = ("camera", "dispatcher", "heartbeat")
+
+    def __init__(self, writer, peername):
+        super().__init__(writer, peername)
+        self.camera: IAmCamera | None = None
+        self.dispatcher = False
+        self.heartbeat: Timer | None = None
+
+    @property
+    def identified(self) -> bool:
+        return self.camera is not None or self.dispatcher
 
 
-app = FastTCP()
+HEARTBEAT = Heartbeat().encode()
+
+# per process, see run()
+tracker = SpeedTracker()
+router = TicketRouter()
+wheel = TimerWheel()  # ticks every decisecond, the unit of WantHeartbeat
+app = FastTCP(
+    mode="protocol",
+    on_unknown_tag=lambda tag: Error(msg="illegal msg"),
+    connection=Client,
+)
 
 
 @app.handler(WantHeartbeat)
-async def heartbeat() -> AsyncGenerator[Heartbeat]:
-    """Sends heartbeat every X seconds"""
-    ...
+def heartbeat(request: WantHeartbeat, client: Client) -> Error | None:
+    """Sends heartbeat every X deciseconds. Returns Error if asked twice."""
+    if client.heartbeat is not None:
+        client.close()
+        return Error(msg="heartbeat already requested")
+    if request.interval:
+        client.heartbeat = wheel.every(request.interval, client.writer, HEARTBEAT)
+    else:
+        client.heartbeat = Timer(client.writer, HEARTBEAT, 0, 0)  # asked, never due
+    return None
 
 
 @app.handler(Plate)
-async def plate() -> Error | None:
-    """Number plate observation from a speed camera. Returns Error if unknown client."""
-    ...
+def plate(request: Plate, client: Client) -> Error | None:
+    """Number plate observation from a speed camera. Returns Error if not a camera."""
+    camera = client.camera
+    if camera is None:
+        client.close()
+        return Error(msg="not a camera")
+    for violation in tracker.observe(
+        request.plate, camera.road, camera.mile, request.timestamp, camera.limit
+    ):
+        router.route(violation.road, Ticket(**violation._asdict()).encode())
+    return None
 
 
 @app.handler(IAmCamera)
-async def camera() -> Error | None:
+def camera(request: IAmCamera, client: Client) -> Error | None:
     """This client is a camera at X road Y mile with Z speed limit. Returns Error if client type is known."""
-    ...
+    if client.identified:
+        client.close()
+        return Error(msg="already identified")
+    client.camera = request
+    return None
 
 
 @app.handler(IAmDispatcher)
-async def dispatcher() -> Error | None:
+def dispatcher(request: IAmDispatcher, client: Client) -> Error | None:
     """This client is a ticket dispatcher who handles X number of roads. Returns Error if client type is known."""
-    ...
+    if client.identified:
+        client.close()
+        return Error(msg="already identified")
+    client.dispatcher = True
+    router.register(client.writer, request.roads)
+    return None
+
+
+@app.on_disconnect
+def gone(client: Client) -> None:
+    if client.heartbeat is not None:
+        client.heartbeat.cancel()
+    if client.dispatcher:
+        router.unregister(client.writer)
 
 
-@app.parser()
-async def parser(stream: asyncio.StreamReader) -> AsyncGenerator[Struct, None]:
-    """Parse the stream of bytes and decode it into types we can work with."""
-    yield WantHeartbeat()
+def run(workers: int = 1) -> None:
+    # tracker, router and wheel hold the clients' transports, which no state
+    # backend can share: a camera and the dispatcher for its road must meet in
+    # one process, or tickets go missing
+    if workers > 1:
+        raise ValueError("The Speed Daemon keeps its clients in one process")
+    app.run()
 
 
 if __name__ == "__main__":
-    ...
-    # app.run()
+    run()
@@ -0,0 +1,12 @@
+"""Micro-benchmarks, run from the python/ directory: python -m benchmarks.<name>"""
+
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed(label: str, count: int, unit: str = "frames"):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<24} {count / elapsed:>14,.0f} {unit}/s  ({elapsed:.2f}s)")
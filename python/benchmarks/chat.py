@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+
+from fastsocket.chat import Member, Room
+
+USERS = (10, 1_000, 10_000)
+
+
+class Sink:
+    """A StreamWriter stand-in that records when each broadcast reaches it."""
+
+    def __init__(self, sent_at: dict[bytes, float], latencies: list[float], slow=False):
+        self.sent_at = sent_at
+        self.latencies = latencies
+        self.slow = slow
+        self.transport = self
+
+    def writelines(self, batch: list[bytes]) -> None:
+        now = time.perf_counter()
+        for data in batch:
+            if data in self.sent_at:
+                self.latencies.append(now - self.sent_at[data])
+
+    async def drain(self) -> None:
+        if self.slow:  # a client that stopped reading, the socket never drains
+            await asyncio.Event().wait()
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+async def measure(users: int, messages: int, slow: int, policy: str):
+    room = Room(slow_consumer=policy, outbox_size=64)
+    sent_at: dict[bytes, float] = {}
+    latencies: list[float] = []
+    members = [
+        Member(f"user{i}", Sink(sent_at, latencies, slow=i < slow), room.outbox_size)
+        for i in range(users)
+    ]
+    for member in members:
+        room.members[member] = None  # join() would announce every one of them
+
+    sender = members[-1]
+    expected = (users - 1 - slow) * messages
+    start = time.perf_counter()
+    for i in range(messages):
+        message = f"[{sender.name}] message {i}\n"
+        sent_at[message.encode()] = time.perf_counter()
+        room.broadcast(sender, message)
+        await asyncio.sleep(0.001)  # messages come in spread out, not all at once
+    while len(latencies) < expected:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    for member in members:
+        member.abort()
+    latencies.sort()
+    return (
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+        len(latencies) / elapsed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--messages", type=int, default=100)
+    parser.add_argument("-s", "--slow", type=int, default=1, help="clients not reading")
+    parser.add_argument("--policy", choices=("drop", "disconnect"), default="drop")
+    args = parser.parse_args()
+
+    print(
+        f"delivery latency of {args.messages} broadcasts, "
+        f"{args.slow} slow consumer(s), policy {args.policy}"
+    )
+    for users in USERS:
+        p50, p99, rate = asyncio.run(
+            measure(users, args.messages, args.slow, args.policy)
+        )
+        label = f"{users:,} users"
+        print(f"  {label:<14} p50 {p50:8.2f}ms  p99 {p99:8.2f}ms  {rate:>9,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
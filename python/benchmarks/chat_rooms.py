@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import random
+import tracemalloc
+
+from fastsocket.chat import Member, Room
+
+from . import timed
+
+
+class Null:
+    """A StreamWriter stand-in that drops everything."""
+
+    def __init__(self):
+        self.transport = self
+
+    def abort(self) -> None:
+        pass
+
+    def writelines(self, batch: list[bytes]) -> None:
+        pass
+
+    async def drain(self) -> None:
+        pass
+
+
+class LegacyRoom:
+    # Budget Chat's presence before Room: a list, rebuilt roster, list.remove
+    def __init__(self):
+        self.users: list[Member] = []
+
+    def join(self, member: Member) -> bytes:
+        online_users = ", ".join(user.name for user in self.users)
+        self.broadcast(member, f"* {member.name} has entered the room\n")
+        self.users.append(member)
+        return f"* The room contains: {online_users}\n".encode()
+
+    def leave(self, member: Member) -> None:
+        self.broadcast(member, f"* {member.name} has left the room\n")
+        self.users.remove(member)
+
+    def broadcast(self, sender: Member, message: str) -> None:
+        data = message.encode()
+        for user in self.users:
+            if user is not sender:
+                user.send(data)
+
+
+def churn(room, members: list[Member], newcomers: list[Member]) -> None:
+    # someone in the middle of the room leaves, someone new comes in
+    rng = random.Random(42)
+    for newcomer in newcomers:
+        leaving = members.pop(rng.randrange(len(members)))
+        room.leave(leaving)
+        leaving.abort()
+        room.join(newcomer)
+        members.append(newcomer)
+
+
+async def presence(size: int, churns: int) -> None:
+    print(f"room of {size:,}, {churns:,} leaves and joins")
+    for label, room in (("list, rebuilt roster", LegacyRoom()), ("Room", Room())):
+        # a huge outbox, this measures presence and not the slow consumer policy
+        members = [Member(f"user{i}", Null(), 1 << 20) for i in range(size)]
+        for member in members:
+            room.join(member)
+        newcomers = [Member(f"new{i}", Null(), 1 << 20) for i in range(churns)]
+        with timed(label, 2 * churns, "ops"):
+            churn(room, members, newcomers)
+        for member in members:
+            member.abort()
+        await asyncio.sleep(0)
+
+
+async def fill(users: int, rooms: int) -> list[tuple[Room, Member]]:
+    shard: dict[str, Room] = {}
+    members = []
+    rng = random.Random(42)
+    for i in range(users):
+        room_name = f"room{rng.randrange(rooms)}"
+        room = shard.get(room_name)
+        if room is None:
+            room = shard[room_name] = Room()
+        member = Member(f"user{i}", Null())
+        member.send(room.join(member))
+        members.append((room, member))
+        if i % 10 == 0:
+            await asyncio.sleep(0)  # logins come in one by one, let writers run
+    await asyncio.sleep(0)
+    return members
+
+
+async def hub(users: int, rooms: int) -> None:
+    print(f"{users:,} users over {rooms:,} rooms, one shard")
+    with timed("join", users, "users"):
+        members = await fill(users, rooms)
+    with timed("leave", users, "users"):
+        for room, member in members:
+            room.leave(member)
+            member.abort()
+    await asyncio.sleep(0)
+
+    tracemalloc.start()
+    members = await fill(users, rooms)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {'memory':<24} {used / users:>14,.0f} bytes/user")
+    for room, member in members:
+        member.abort()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--churns", type=int, default=200)
+    parser.add_argument("-u", "--users", type=int, default=100_000)
+    parser.add_argument("-r", "--rooms", type=int, default=2_000)
+    args = parser.parse_args()
+
+    for size in (10, 1_000, 10_000):
+        asyncio.run(presence(size, args.churns))
+    asyncio.run(hub(args.users, args.rooms))
+
+
+if __name__ == "__main__":
+    main()
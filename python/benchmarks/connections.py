@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import importlib.util
+import io
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastsocket import FastTCP
+from fastsocket.framing import FrameBuffer
+from fastsocket.protocol import FastTCPProtocol
+
+SCRIPT = Path(__file__).parent.parent / "06-speed-daemon-fastsocket.py"
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("speed_daemon", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Transport:
+    """The bits of an asyncio transport a protocol touches when it connects."""
+
+    __slots__ = ("peername",)
+
+    def __init__(self, peername: tuple[str, int]):
+        self.peername = peername
+
+    def get_extra_info(self, name: str):
+        return self.peername if name == "peername" else None
+
+    def set_write_buffer_limits(self, high: int) -> None:
+        pass
+
+
+# FastTCPProtocol before it had __slots__, with the client state kept by the
+# server in a dict keyed by peername, as 06-speed-daemon-fastsocket.py sketched it
+class LegacyProtocol(asyncio.Protocol):
+    def __init__(self, app: FastTCP):
+        self.app = app
+        self.buffer = FrameBuffer()
+        self.pending: deque = deque()
+        self.task = None
+        self.transport = None
+        self.out: list[bytes] = []
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.app.write_high_water)
+        self.addr = transport.get_extra_info("peername")
+        clients[self.addr] = LegacyClient(type=None)
+
+
+@dataclass
+class LegacyClient:
+    type: str | None
+
+
+clients: dict[tuple[str, int], LegacyClient] = {}
+
+
+def measure(label: str, protocol_factory, transports: list[Transport]):
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):  # "Connection from ..."
+        before = tracemalloc.get_traced_memory()[0]
+        protocols = []
+        for transport in transports:
+            protocol = protocol_factory()
+            protocol.connection_made(transport)
+            protocols.append(protocol)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # the list holding the protocols is the benchmark's, not the server's
+    used -= len(protocols) * 8
+    print(f"  {label:<32} {used / len(transports):>8,.0f} bytes/connection")
+    clients.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--connections", type=int, default=100_000)
+    args = parser.parse_args()
+
+    speed_daemon = load_script()
+    transports = [
+        Transport((f"10.{i >> 16}.{i >> 8 & 255}.{i & 255}", 50000))
+        for i in range(args.connections)
+    ]
+    plain = FastTCP(mode="protocol")
+
+    print(f"{args.connections:,} idle connections, FastTCP(mode='protocol')")
+    measure("before, state in a dict", lambda: LegacyProtocol(plain), transports)
+    measure("Connection", lambda: FastTCPProtocol(plain), transports)
+    measure(
+        "Speed Daemon Client",
+        lambda: FastTCPProtocol(speed_daemon.app),
+        transports,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+
+from fastsocket.framing import FrameBuffer
+
+from . import timed
+
+CHUNK_SIZE = 4096
+FRAME_SIZE = 9  # means-to-an-end sized frames
+
+
+def legacy_sized(chunks, size):
+    # the generator FastTCP._parse_requests used before FrameBuffer
+    data = bytes()
+    for chunk in chunks:
+        data += chunk
+        while len(data) >= size:
+            yield data[:size]
+            data = data[size:]
+
+
+def legacy_delimited(chunks, delimiter):
+    data = bytes()
+    for chunk in chunks:
+        data += chunk
+        while delimiter in data:
+            frame, data = data.split(delimiter, 1)
+            yield frame
+
+
+def framebuffer_sized(chunks, size):
+    buffer = FrameBuffer()
+    for chunk in chunks:
+        buffer.feed(chunk)
+        yield from buffer.frames_sized(size)
+
+
+def framebuffer_delimited(chunks, delimiter):
+    buffer = FrameBuffer()
+    for chunk in chunks:
+        buffer.feed(chunk)
+        yield from buffer.frames_delimited(delimiter)
+
+
+def chunked(stream: bytes, size: int = CHUNK_SIZE) -> list[bytes]:
+    return [stream[i : i + size] for i in range(0, len(stream), size)]
+
+
+def run(label, frames, expected):
+    count = 0
+    with timed(label, expected):
+        for _ in frames:
+            count += 1
+    assert count == expected, (label, count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--frames", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.frames
+
+    sized = chunked(b"I\x00\x00\x30\x39\x00\x00\x00\x65" * n)
+    lines = chunked(b"".join(b"message number %d\n" % i for i in range(n)))
+
+    print(f"{n:,} fixed-size frames ({FRAME_SIZE} bytes) in {CHUNK_SIZE} byte reads")
+    run("legacy bytes slicing", legacy_sized(sized, FRAME_SIZE), n)
+    run("FrameBuffer", framebuffer_sized(sized, FRAME_SIZE), n)
+
+    print(f"{n:,} newline-delimited frames in {CHUNK_SIZE} byte reads")
+    run("legacy bytes.split", legacy_delimited(lines, b"\n"), n)
+    run("FrameBuffer", framebuffer_delimited(lines, b"\n"), n)
+
+
+if __name__ == "__main__":
+    main()
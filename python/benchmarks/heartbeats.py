@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import time
+
+from fastsocket.timers import TimerWheel
+
+HEARTBEAT = b"\x41"
+
+
+class Sink:
+    """Counts writes, a StreamWriter stand-in for a client."""
+
+    written = 0
+
+    def write(self, data: bytes) -> None:
+        Sink.written += 1
+
+
+async def sleeping_task(writer: Sink, interval: float) -> None:
+    # what a heartbeat handler does on its own, one task and timer per client
+    while True:
+        await asyncio.sleep(interval)
+        writer.write(HEARTBEAT)
+
+
+async def measure(label: str, clients: int, interval: float, seconds: float):
+    Sink.written = 0
+    tasks, timers = [], []
+    if label == "TimerWheel":
+        wheel = TimerWheel(interval)
+        timers = [wheel.every(1, Sink(), HEARTBEAT) for _ in range(clients)]
+    else:
+        tasks = [
+            asyncio.create_task(sleeping_task(Sink(), interval))
+            for _ in range(clients)
+        ]
+    await asyncio.sleep(interval * 2)  # settle in
+
+    written, cpu, wall = Sink.written, time.process_time(), time.perf_counter()
+    await asyncio.sleep(seconds)
+    written = Sink.written - written
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    for task in tasks:
+        task.cancel()
+    for timer in timers:
+        timer.cancel()
+    await asyncio.sleep(interval * 2)
+
+    expected = clients * wall / interval
+    print(
+        f"  {label:<24} CPU {cpu / wall:>6.1%}  "
+        f"{written:>10,} heartbeats, {written / expected:.0%} of those due"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--clients", type=int, default=50_000)
+    parser.add_argument("-i", "--interval", type=float, default=0.1, help="seconds")
+    parser.add_argument("-s", "--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.clients:,} clients, a heartbeat every {args.interval}s")
+    for label in ("asyncio.sleep per client", "TimerWheel"):
+        asyncio.run(measure(label, args.clients, args.interval, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+
+from fastsocket.kvstore import ENTRY_OVERHEAD, HEADER, KVStore
+
+from . import timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--keys", type=int, default=10_000_000)
+    parser.add_argument("--value-size", type=int, default=16)
+    args = parser.parse_args()
+    n = args.keys
+    value = b"v" * args.value_size
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "kv.log")
+        print(f"{n:,} keys, {args.value_size} byte values")
+
+        store = KVStore(path)
+        with timed("append to the log", n, "keys"):
+            for i in range(n):
+                store.set(b"key%d" % i, value)
+            store.flush()
+        store.close()
+        print(f"  {'log size':<24} {os.path.getsize(path) / (1 << 20):>14,.1f} MiB")
+        del store
+
+        with timed("recover", n, "keys"):
+            store = KVStore(path)
+        assert len(store) == n
+
+        # overwrite every key once more, half the log is garbage now
+        for i in range(n):
+            store.set(b"key%d" % i, value)
+        store.flush()
+        with timed("compact", n, "keys"):
+            store.compact()
+        store.close()
+        del store
+
+        per_key = HEADER.size + ENTRY_OVERHEAD + len(b"key%d" % n) + args.value_size
+        budget = n // 2 * per_key
+        with timed("recover, half fits", n, "keys"):
+            store = KVStore(path, max_bytes=budget)
+        print(f"  {'kept':<24} {len(store):>14,} keys")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
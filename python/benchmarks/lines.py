@@ -0,0 +1,64 @@
+import argparse
+
+from fastsocket.framing import LineFramer
+
+from . import timed
+
+CHUNK_SIZE = 4096
+LINE_LENGTHS = (16, 128, 1024, 16 * 1024, 60 * 1024)
+
+
+def legacy_split(chunks: list[bytes]) -> int:
+    # the splitter 01-prime-time-socketserver.py used before LineFramer
+    count = 0
+    data = b""
+    for chunk in chunks:
+        data += chunk
+        while b"\n" in data:
+            message, data = data.split(b"\n", 1)
+            count += 1
+    return count
+
+
+def legacy_str(chunks: list[bytes]) -> int:
+    # the splitter 03-budget-chat-socketserver.py used before LineFramer
+    count = 0
+    data = ""
+    for chunk in chunks:
+        data += chunk.decode("utf-8")
+        while "\n" in data:
+            message, _, data = data.partition("\n")
+            count += 1
+    return count
+
+
+def line_framer(chunks: list[bytes]) -> int:
+    count = 0
+    framer = LineFramer()
+    for chunk in chunks:
+        count += len(framer.feed(chunk))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=32, help="of lines per length")
+    args = parser.parse_args()
+
+    for length in LINE_LENGTHS:
+        n = args.mb * 1_000_000 // (length + 1)
+        stream = (b"x" * length + b"\n") * n
+        chunks = [stream[i : i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+
+        print(f"{n:,} lines of {length:,} bytes in {CHUNK_SIZE} byte reads")
+        for label, split in (
+            ("bytes.split(, 1)", legacy_split),
+            ("str, decoded first", legacy_str),
+            ("LineFramer", line_framer),
+        ):
+            with timed(label, n, "lines"):
+                assert split(chunks) == n, label
+
+
+if __name__ == "__main__":
+    main()
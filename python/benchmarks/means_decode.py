@@ -0,0 +1,96 @@
+import argparse
+import importlib.util
+import random
+import struct
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+
+from . import timed
+
+SCRIPT = Path(__file__).parent.parent / "02-means-to-an-end-asyncio.py"
+READ_SIZES = {"4 KiB": 4 * 1024, "64 KiB": 64 * 1024, "1 MiB": 1024 * 1024}
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("means_to_an_end", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# the decoding 02-means-to-an-end-asyncio.py did before decode_requests
+class RequestType(Enum):
+    INSERT = b"I"
+    QUERY = b"Q"
+
+
+@dataclass
+class Request:
+    FORMAT = "!cii"
+    SIZE = struct.calcsize(FORMAT)
+
+    type: RequestType
+    first: int
+    second: int
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Request":
+        if len(data) != cls.SIZE:
+            raise ValueError("Invalid message size")
+        raw_type, first, second = struct.unpack(cls.FORMAT, data)
+        try:
+            msg_type = RequestType(raw_type)
+        except ValueError:
+            raise ValueError(f"Unknown message type: {raw_type!r}")
+        return cls(msg_type, first, second)
+
+
+def legacy_decode(chunks: list[bytes]) -> int:
+    count = 0
+    data = bytes()
+    for chunk in chunks:
+        data += chunk
+        while len(data) >= Request.SIZE:
+            Request.from_bytes(data[: Request.SIZE])
+            count += 1
+            data = data[Request.SIZE :]
+    return count
+
+
+def bulk_decode(decode_requests, chunks: list[bytes]) -> int:
+    count = 0
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        count += len(decode_requests(buffer))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--frames", type=int, default=200_000)
+    args = parser.parse_args()
+    decode_requests = load_script().decode_requests
+
+    rng = random.Random(42)
+    stream = b"".join(
+        struct.pack("!cii", rng.choice(b"IQ").to_bytes(), rng.randrange(1 << 30), i)
+        for i in range(args.frames)
+    )
+    print(f"{args.frames:,} Means to an End frames")
+    for label, size in READ_SIZES.items():
+        # read sizes aren't a multiple of 9, so most reads end in a partial frame
+        chunks = [stream[i : i + size] for i in range(0, len(stream), size)]
+        print(f"{label} reads")
+        if size <= READ_SIZES["64 KiB"]:
+            with timed("unpack per frame", args.frames):
+                assert legacy_decode(chunks) == args.frames
+        else:
+            print("  unpack per frame         too slow to measure")
+        with timed("iter_unpack per read", args.frames):
+            assert bulk_decode(decode_requests, chunks) == args.frames
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import importlib.util
+import random
+import re
+import string
+import time
+from pathlib import Path
+
+from . import timed
+
+SCRIPT = Path(__file__).parent.parent / "05-mob-in-the-middle-asyncio.py"
+READ_SIZE = 64 * 1024
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("mob_in_the_middle", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# the rewriting 05-mob-in-the-middle-asyncio.py did before fastsocket.rewrite
+LEGACY_RE = re.compile(r"(^|\s)7[a-zA-Z0-9]{25,34}(?=\s|$)")
+LEGACY_TONY = "7YWHMfk9JZe0LM0g1ZauHuiSxhI"
+
+
+async def legacy_transform(text: bytes) -> bytes:
+    return LEGACY_RE.sub(lambda m: m.group(1) + LEGACY_TONY, text.decode()).encode()
+
+
+def chat_lines(count: int, with_address: float) -> list[bytes]:
+    """Budget Chat traffic, a with_address share of lines carries an address."""
+    rng = random.Random(42)
+    alphabet = string.ascii_letters + string.digits
+    words = [b"hi", b"send", b"the", b"coins", b"to", b"please", b"thanks", b"ok"]
+    lines = []
+    for i in range(count):
+        line = b" ".join(rng.choices(words, k=rng.randint(3, 12)))
+        if rng.random() < with_address:
+            address = "7" + "".join(rng.choices(alphabet, k=rng.randint(25, 34)))
+            line += b" " + address.encode()
+        lines.append(b"[user%d] " % (i % 100) + line)
+    return lines
+
+
+async def relay(reader, writer, transform, awaited: bool) -> None:
+    # a correctly framed forward(), without the per-line print
+    tail = b""
+    while chunk := await reader.read(READ_SIZE):
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        if awaited:
+            lines = [await transform(line) for line in lines]
+        else:
+            lines = [transform(line) for line in lines]
+        writer.write(b"\n".join(lines) + b"\n")
+        await writer.drain()
+    writer.close()
+
+
+async def proxy(payload: bytes, transform, awaited: bool) -> float:
+    """Pushes payload client -> proxy -> upstream, returns seconds until done."""
+    received = asyncio.get_running_loop().create_future()
+
+    async def upstream(reader, writer):
+        total = 0
+        while chunk := await reader.read(READ_SIZE):
+            total += len(chunk)
+        received.set_result(total)
+        writer.close()
+
+    async def handle(reader, writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(
+            *upstream_server.sockets[0].getsockname()
+        )
+        await relay(reader, upstream_writer, transform, awaited)
+        writer.close()
+
+    upstream_server = await asyncio.start_server(upstream, "127.0.0.1", 0)
+    proxy_server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    _, writer = await asyncio.open_connection(*proxy_server.sockets[0].getsockname())
+
+    start = time.perf_counter()
+    writer.write(payload)
+    await writer.drain()
+    writer.write_eof()
+    await received
+    elapsed = time.perf_counter() - start
+
+    writer.close()
+    proxy_server.close()
+    upstream_server.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--lines", type=int, default=500_000)
+    args = parser.parse_args()
+    transform = load_script().transform
+
+    for share in (0.0, 0.01, 0.1):
+        lines = chat_lines(args.lines, share)
+        payload = b"\n".join(lines) + b"\n"
+        mb = len(payload) / 1e6
+        for line in lines[:1000]:
+            assert transform(line) == asyncio.run(legacy_transform(line))
+
+        print(f"{args.lines:,} lines, {mb:,.1f} MB, {share:.0%} with an address")
+
+        async def legacy():
+            for line in lines:
+                await legacy_transform(line)
+
+        with timed("rewrite, str + await", mb, "MB"):
+            asyncio.run(legacy())
+        with timed("rewrite, Rewriter", mb, "MB"):
+            for line in lines:
+                transform(line)
+
+        for label, fn, awaited in (
+            ("proxy, str + await", legacy_transform, True),
+            ("proxy, Rewriter", transform, False),
+        ):
+            elapsed = asyncio.run(proxy(payload, fn, awaited))
+            print(f"  {label:<24} {mb / elapsed:>14,.1f} MB/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import socket
+import struct
+import time
+
+from fastsocket import FastTCP
+
+from .primes import trial_division
+
+HEAVY = 999_999_999_989  # prime, ~170k trial divisions
+LIGHT = 97
+
+
+class Number:
+    __slots__ = ("value",)
+
+    def __init__(self, value: int):
+        self.value = value
+
+    @classmethod
+    def from_bytes(cls, data) -> "Number":
+        return cls(struct.unpack("!Q", data)[0])
+
+
+class Answer:
+    __slots__ = ("prime",)
+
+    def __init__(self, prime: bool):
+        self.prime = prime
+
+    def to_bytes(self) -> bytes:
+        return b"\x01" if self.prime else b"\x00"
+
+
+def is_prime(request: Number) -> Answer:
+    return Answer(trial_division(request.value))
+
+
+async def heavy_client(port: int, count: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(struct.pack("!Q", HEAVY) * count)
+    await reader.readexactly(count)
+    writer.close()
+
+
+async def light_client(port: int, count: int, latencies: list[float]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = struct.pack("!Q", LIGHT)
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(request)
+        await reader.readexactly(1)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    writer.close()
+
+
+def serve(app: FastTCP, sock: socket.socket):
+    async def serve_forever():
+        async with await app.create_server(sock) as server:
+            await server.serve_forever()
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if app.pool is not None:
+            app.pool.shutdown(cancel_futures=True)
+
+
+async def measure(port: int, heavy: int, clients: int, requests: int):
+    latencies: list[float] = []
+    heavy_task = asyncio.create_task(heavy_client(port, heavy))
+    await asyncio.sleep(0.05)  # let the heavy client get going
+    await asyncio.gather(
+        *(light_client(port, requests, latencies) for _ in range(clients))
+    )
+    await heavy_task
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    return p50, p99, latencies[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--heavy", type=int, default=40, help="heavy requests")
+    parser.add_argument("-c", "--clients", type=int, default=20)
+    parser.add_argument("-n", "--requests", type=int, default=20)
+    parser.add_argument("-p", "--processes", type=int, default=2, help="pool size")
+    args = parser.parse_args()
+
+    print(
+        f"light client latency, {args.clients} clients x {args.requests} requests, "
+        f"while one client sends {args.heavy} heavy requests"
+    )
+    for executor in (None, "process"):
+        app = FastTCP(mode="protocol", process_workers=args.processes)
+        app.handler(Number, request_size=8, executor=executor)(is_prime)
+
+        # the server gets its own process, so a blocked loop can't hide from us
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        sock.setblocking(False)
+        server = multiprocessing.Process(target=serve, args=(app, sock))
+        server.start()
+
+        port = sock.getsockname()[1]
+        p50, p99, worst = asyncio.run(
+            measure(port, args.heavy, args.clients, args.requests)
+        )
+        server.terminate()
+        server.join()
+        sock.close()
+
+        label = f"executor={executor}"
+        print(f"  {label:<20} p50 {p50:8.2f}ms  p99 {p99:8.2f}ms  max {worst:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
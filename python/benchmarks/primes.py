@@ -0,0 +1,57 @@
+import argparse
+import random
+
+from fastsocket.primes import PrimalityTester
+
+from . import timed
+
+
+def trial_division(number):
+    # the is_prime Prime Time used before fastsocket.primes, 6k +- 1 up to sqrt(n)
+    if number <= 1 or int(number) != number:
+        return False
+    elif number in (2, 3):
+        return True
+    elif number % 2 == 0 or number % 3 == 0:
+        return False
+
+    for i in range(6, int(number**0.5) + 2, 6):
+        if number % (i - 1) == 0 or number % (i + 1) == 0:
+            return False
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--numbers", type=int, default=10_000)
+    args = parser.parse_args()
+    n = args.numbers
+
+    rng = random.Random(42)
+    inputs = {
+        "small (< 2**20)": [rng.randrange(1 << 20) for _ in range(n)],
+        "32-bit": [rng.randrange(1 << 31, 1 << 32) | 1 for _ in range(n)],
+        "64-bit": [rng.randrange(1 << 63, 1 << 64) | 1 for _ in range(n)],
+        "200-digit": [rng.randrange(10**199, 10**200) | 1 for _ in range(n // 10)],
+    }
+    # trial division only gets a sample of what it can finish in reasonable time
+    legacy_sample = {"small (< 2**20)": n, "32-bit": n // 10}
+
+    tester = PrimalityTester(cache_size=0)
+    for label, numbers in inputs.items():
+        print(label)
+        if label in legacy_sample:
+            sample = numbers[: legacy_sample[label]]
+            with timed("6k+-1 trial division", len(sample), "numbers"):
+                for number in sample:
+                    trial_division(number)
+        else:
+            print("  6k+-1 trial division     too slow to measure")
+        with timed("fastsocket.primes", len(numbers), "numbers"):
+            for number in numbers:
+                tester.is_prime(number)
+
+
+if __name__ == "__main__":
+    main()
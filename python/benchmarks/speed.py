@@ -0,0 +1,129 @@
+import argparse
+import random
+
+from fastsocket.speed import DAY, SpeedTracker, TicketRouter
+
+from . import timed
+
+LIMIT = 60
+
+
+class NaiveTracker:
+    # every sighting of a plate against every earlier one, a list per plate
+    def __init__(self):
+        self.sightings: dict[str, list[tuple[int, int, int]]] = {}
+        self.ticketed: set[tuple[str, int]] = set()
+
+    def observe(self, plate, road, mile, timestamp, limit) -> list:
+        seen = self.sightings.setdefault(plate, [])
+        violations = []
+        for other_road, other_mile, other_timestamp in seen:
+            if other_road != road or other_timestamp == timestamp:
+                continue
+            (timestamp1, mile1), (timestamp2, mile2) = sorted(
+                ((timestamp, mile), (other_timestamp, other_mile))
+            )
+            speed = abs(mile2 - mile1) * 3600 / (timestamp2 - timestamp1)
+            if speed < limit + 0.5:
+                continue
+            days = range(timestamp1 // DAY, timestamp2 // DAY + 1)
+            if any((plate, day) in self.ticketed for day in days):
+                continue
+            self.ticketed.update((plate, day) for day in days)
+            violations.append((plate, road, mile1, timestamp1, mile2, timestamp2))
+        seen.append((road, mile, timestamp))
+        return violations
+
+
+class Sink:
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data: bytes) -> None:
+        self.written += len(data)
+
+
+def scan_route(clients: list[tuple[Sink, set[int]]], road: int, ticket: bytes):
+    # the first connected dispatcher for the road, found by looking at all of them
+    for writer, roads in clients:
+        if road in roads:
+            writer.write(ticket)
+            return
+
+
+def observations(count: int, cameras: int, per_road: int, plates: int) -> list:
+    """Cars driving past every camera of a road, reported in no particular order."""
+    rng = random.Random(42)
+    roads = cameras // per_road
+    result = []
+    while len(result) < count:
+        plate = f"P{rng.randrange(plates):05d}"
+        road = rng.randrange(roads)
+        start = rng.randrange(30 * DAY)
+        mph = rng.uniform(40, 75)
+        for camera in range(per_road):
+            mile = camera * 10
+            result.append((plate, road, mile, start + round(mile / mph * 3600), LIMIT))
+    del result[count:]
+    rng.shuffle(result)
+    return result
+
+
+def run(tracker, sightings: list) -> int:
+    observe = tracker.observe
+    tickets = 0
+    for sighting in sightings:
+        tickets += len(observe(*sighting))
+    return tickets
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--observations", type=int, default=1_000_000)
+    parser.add_argument("-c", "--cameras", type=int, default=10_000)
+    parser.add_argument("--per-road", type=int, default=100, help="cameras")
+    parser.add_argument("-p", "--plates", type=int, default=5_000)
+    parser.add_argument("--naive", type=int, default=100_000, help="observations")
+    parser.add_argument("-d", "--dispatchers", type=int, default=1_000)
+    parser.add_argument("-t", "--tickets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    sightings = observations(
+        args.observations, args.cameras, args.per_road, args.plates
+    )
+    print(
+        f"{args.observations:,} observations from {args.cameras:,} cameras, "
+        f"{args.plates:,} plates"
+    )
+    for label, tracker, count in (
+        ("every earlier sighting", NaiveTracker(), args.naive),
+        ("SpeedTracker", SpeedTracker(), args.observations),
+    ):
+        with timed(label, count, "observations"):
+            tickets = run(tracker, sightings[:count])
+        print(f"  {'':<24} {tickets:>14,} tickets from the first {count:,}")
+
+    rng = random.Random(42)
+    roads = args.cameras // args.per_road
+    clients = [
+        (Sink(), set(rng.sample(range(roads), 5))) for _ in range(args.dispatchers)
+    ]
+    router = TicketRouter()
+    for writer, dispatched in clients:
+        router.register(writer, list(dispatched))
+    tickets = [(rng.randrange(roads), b"\x21" + bytes(20)) for _ in range(args.tickets)]
+    print(
+        f"{args.tickets:,} tickets over {args.dispatchers:,} dispatchers, "
+        f"{roads} roads"
+    )
+    with timed("scan every client", args.tickets, "tickets"):
+        for road, ticket in tickets:
+            scan_route(clients, road, ticket)
+    with timed("TicketRouter", args.tickets, "tickets"):
+        route = router.route
+        for road, ticket in tickets:
+            route(road, ticket)
+
+
+if __name__ == "__main__":
+    main()
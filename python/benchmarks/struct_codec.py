@@ -0,0 +1,155 @@
+import argparse
+import struct
+from typing import get_args, get_origin
+
+from fastsocket import (
+    Struct,
+    byte,
+    f32,
+    f64,
+    i8,
+    i16,
+    i32,
+    i64,
+    rune,
+    u8,
+    u16,
+    u32,
+    u64,
+)
+from fastsocket.struct import FMT_MAP
+
+from . import timed
+
+
+# same layouts as examples/struct_examples.py and 06-speed-daemon-fastsocket.py
+class Numbers(Struct):
+    a: i8
+    b: u8
+    c: i16
+    d: u16
+    e: i32
+    f: u32
+    g: i64
+    h: u64
+    i: f32
+    j: f64
+    k: bool
+    m: byte
+    n: rune
+
+
+class Iterables(Struct):
+    a: str
+    b: list[u8]
+
+
+class Ticket(Struct):
+    message_type: u8 = u8(0x21)
+
+    plate: str
+    road: u16
+    mile1: u16
+    timestamp1: u32
+    mile2: u16
+    timestamp2: u32
+    speed: u16
+
+
+def legacy_struct(obj: Struct) -> struct.Struct:
+    # the model_struct property StructMeta used to install, built on every call
+    fmt = "!"
+    for field_name, field_type in obj.__annotations__.items():
+        value = getattr(obj, field_name)
+        if field_type in FMT_MAP:
+            fmt += FMT_MAP[field_type]
+        elif field_type is str:
+            fmt += f"B{len(value)}s"
+        elif get_origin(field_type) is list:
+            fmt += f"B{len(value)}{FMT_MAP[get_args(field_type)[0]]}"
+    return struct.Struct(fmt)
+
+
+def legacy_encode(obj: Struct) -> bytes:
+    values = []
+    for field in obj.model_fields:
+        val = getattr(obj, field)
+        if isinstance(val, str):
+            values.append(len(val))
+            values.append(val.encode())
+        elif isinstance(val, list):
+            values.append(len(val))
+            values.extend(val)
+        else:
+            values.append(val)
+    return legacy_struct(obj).pack(*values)
+
+
+def legacy_decode(cls: type[Struct], data: bytes, template: Struct) -> Struct:
+    # the old decode only worked for fixed width models, and needed an instance
+    # to build the struct from (cls() raised for required fields)
+    unpacked = legacy_struct(template).unpack(data)
+    return cls(**dict(zip(cls.model_fields, unpacked)))
+
+
+def bench(obj: Struct, n: int):
+    cls = type(obj)
+    data = obj.encode()
+    assert legacy_encode(obj) == data
+
+    print(f"{cls.__name__} ({len(data)} bytes)")
+    with timed("legacy encode", n, "ops"):
+        for _ in range(n):
+            legacy_encode(obj)
+    with timed("generated encode", n, "ops"):
+        for _ in range(n):
+            obj.encode()
+
+    if all(t in FMT_MAP for t in cls.__annotations__.values()):
+        with timed("legacy decode", n, "ops"):
+            for _ in range(n):
+                legacy_decode(cls, data, obj)
+    else:
+        print("  legacy decode            unsupported (variable length fields)")
+    with timed("generated decode", n, "ops"):
+        for _ in range(n):
+            cls.decode(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--ops", type=int, default=200_000)
+    args = parser.parse_args()
+
+    numbers = Numbers(
+        a=-1,
+        b=255,
+        c=-12345,
+        d=54321,
+        e=-123456789,
+        f=123456789,
+        g=-1234567890123456789,
+        h=1234567890123456789,
+        i=3.14,
+        j=2.718281828,
+        k=True,
+        m=255,
+        n=65,
+    )
+    iterables = Iterables(a="hello", b=[1, 2, 3, 4, 5])
+    ticket = Ticket(
+        plate="UN1X",
+        road=66,
+        mile1=100,
+        timestamp1=123456,
+        mile2=110,
+        timestamp2=123816,
+        speed=10000,
+    )
+
+    for obj in (numbers, iterables, ticket):
+        bench(obj, args.ops)
+
+
+if __name__ == "__main__":
+    main()
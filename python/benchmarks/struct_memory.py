@@ -0,0 +1,128 @@
+import argparse
+import gc
+import tracemalloc
+
+from fastsocket import Struct, u8, u16, u32
+from fastsocket.struct import make_codec
+
+from . import timed
+
+
+# the two messages a Speed Daemon server sees the most of
+class Plate(Struct):
+    message_type: u8 = u8(0x20)
+
+    plate: str
+    timestamp: u32
+
+
+class Ticket(Struct):
+    message_type: u8 = u8(0x21)
+
+    plate: str
+    road: u16
+    mile1: u16
+    timestamp1: u32
+    mile2: u16
+    timestamp2: u32
+    speed: u16
+
+
+def legacy(cls: type) -> type:
+    # what StructMeta built before __slots__: a __dict__ per instance filled by a
+    # setattr per field, defaults left as class attributes
+    fields = list(cls.__annotations__)
+    defaults = {k: getattr(cls, k) for k in fields if hasattr(cls, k)}
+
+    def __new__(cls, **data):
+        self = object.__new__(cls)
+        for field in fields:
+            if field in data:
+                setattr(self, field, data[field])
+            elif field not in defaults:
+                raise TypeError(f"Missing required argument: {field}")
+        return self
+
+    types = list(cls.__annotations__.values())
+    encode, decode, _ = make_codec(cls.__name__, fields, types)
+    cls.__new__ = __new__
+    cls.encode = encode
+    cls.decode = classmethod(decode)
+    return cls
+
+
+@legacy
+class LegacyPlate:
+    message_type: u8 = u8(0x20)
+
+    plate: str
+    timestamp: u32
+
+
+@legacy
+class LegacyTicket:
+    message_type: u8 = u8(0x21)
+
+    plate: str
+    road: u16
+    mile1: u16
+    timestamp1: u32
+    mile2: u16
+    timestamp2: u32
+    speed: u16
+
+
+def bytes_per_instance(make, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [make() for _ in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # the list is the benchmark's, the field values are shared by every instance
+    return (used - len(instances) * 8) / n
+
+
+def bench(label: str, cls: type, data: dict, n: int):
+    make = lambda: cls(**data)  # noqa: E731
+    encoded = cls(**data).encode()
+    print(f"  {label:<24} {bytes_per_instance(make, n):>14,.0f} bytes/instance")
+    with timed(label, n, "instances"):
+        for _ in range(n):
+            cls(**data)
+    with timed(label + ".decode", n, "instances"):
+        decode = cls.decode
+        for _ in range(n):
+            decode(encoded)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--instances", type=int, default=500_000)
+    args = parser.parse_args()
+
+    plate = {"plate": "UN1X", "timestamp": 1_000_000}
+    ticket = {
+        "plate": "UN1X",
+        "road": 66,
+        "mile1": 100,
+        "timestamp1": 123_456,
+        "mile2": 110,
+        "timestamp2": 123_816,
+        "speed": 10_000,
+    }
+    print(f"{args.instances:,} instances")
+    print("Plate")
+    bench("__dict__", LegacyPlate, plate, args.instances)
+    bench("__slots__", Plate, plate, args.instances)
+    print("Ticket")
+    bench("__dict__", LegacyTicket, ticket, args.instances)
+    bench("__slots__", Ticket, ticket, args.instances)
+    with timed("__slots__, by position", args.instances, "instances"):
+        values = tuple(ticket.values())
+        for _ in range(args.instances):
+            Ticket(*values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import random
+
+from fastsocket import TimeSeries, timeseries_backend
+
+from . import timed
+
+INSERT, QUERY = b"I", b"Q"
+
+
+class DictStore:
+    # what both Means to an End servers did before TimeSeries, a scan per query
+    def __init__(self):
+        self.db = {}
+
+    def insert(self, timestamp: int, price: int) -> None:
+        self.db[timestamp] = price
+
+    def mean(self, mintime: int, maxtime: int) -> int:
+        total = count = 0
+        for timestamp, price in self.db.items():
+            if mintime <= timestamp <= maxtime:
+                total += price
+                count += 1
+        return int(total / count if count else 0)
+
+
+def session(points: int, query_every: int, shuffled: float, seed: int = 42):
+    """A client session: inserts mostly in time order, with a query every so often."""
+    rng = random.Random(seed)
+    times = list(range(0, points * 60, 60))  # one price a minute
+    # a fraction of the points arrive late, at a random later position
+    for _ in range(int(points * shuffled)):
+        i, j = rng.randrange(points), rng.randrange(points)
+        times[i], times[j] = times[j], times[i]
+
+    ops = []
+    for i, timestamp in enumerate(times, 1):
+        ops.append((INSERT, timestamp, rng.randrange(1, 100_000)))
+        if i % query_every == 0:
+            lo = rng.randrange(0, timestamp + 1)
+            ops.append((QUERY, lo, lo + rng.randrange(60, points * 60)))
+    return ops
+
+
+def replay(store, ops) -> None:
+    insert, mean = store.insert, store.mean
+    for op, first, second in ops:
+        if op is INSERT:
+            insert(first, second)
+        else:
+            mean(first, second)
+
+
+def bulk(store, points: list[tuple[int, int]], bursts: list[list[tuple[int, int]]]):
+    insert = store.insert
+    for timestamp, price in points:
+        insert(timestamp, price)
+    for ranges in bursts:
+        store.means(ranges)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-q", "--query-every", type=int, default=100)
+    parser.add_argument("-s", "--shuffled", type=float, default=0.01)
+    parser.add_argument("--legacy-max", type=int, default=100_000)
+    parser.add_argument("-b", "--burst", type=int, default=1_000, help="queries")
+    args = parser.parse_args()
+
+    for points in (10_000, 100_000, 1_000_000):
+        ops = session(points, args.query_every, args.shuffled)
+        print(f"{points:,} points, a query every {args.query_every} inserts")
+        if points <= args.legacy_max:
+            with timed("dict scan", len(ops), "ops"):
+                replay(DictStore(), ops)
+        else:
+            print("  dict scan                too slow to measure")
+        with timed("TimeSeries", len(ops), "ops"):
+            replay(TimeSeries(), ops)
+
+    numpy_series = timeseries_backend("numpy")
+    rng = random.Random(42)
+    for points in (100_000, 1_000_000):
+        rows = [(rng.randrange(1 << 30), rng.randrange(100_000)) for _ in range(points)]
+        bursts = []
+        for _ in range(10):
+            starts = [rng.randrange(1 << 30) for _ in range(args.burst)]
+            bursts.append([(lo, lo + rng.randrange(1 << 28)) for lo in starts])
+
+        count = points + 10 * args.burst
+        print(f"{points:,} random inserts, then 10 bursts of {args.burst} queries")
+        with timed("TimeSeries", count, "ops"):
+            bulk(TimeSeries(), rows, bursts)
+        if numpy_series is TimeSeries:
+            print("  NumpyTimeSeries          NumPy is not installed")
+        else:
+            with timed("NumpyTimeSeries", count, "ops"):
+                bulk(numpy_series(), rows, bursts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import socket
+
+from fastsocket import FastTCP
+
+from . import timed
+
+FRAME_SIZE = 9
+
+
+class Echo:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def from_bytes(cls, data) -> "Echo":
+        return cls(bytes(data))
+
+    def to_bytes(self) -> bytes:
+        return self.data
+
+
+def make_app(mode: str, handler_kind: str) -> FastTCP:
+    app = FastTCP(mode=mode)
+
+    if handler_kind == "sync":
+
+        @app.handler(Echo, request_size=FRAME_SIZE)
+        def echo(request: Echo) -> Echo:
+            return request
+
+    else:
+
+        @app.handler(Echo, request_size=FRAME_SIZE)
+        async def echo(request: Echo) -> Echo:
+            return request
+
+    return app
+
+
+def listen() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    sock.setblocking(False)
+    return sock
+
+
+async def pipeline(app: FastTCP, count: int, clients: int) -> None:
+    sock = listen()
+    port = sock.getsockname()[1]
+    server = await app.create_server(sock)
+    payload = b"I\x00\x00\x30\x39\x00\x00\x00\x65" * (count // clients)
+
+    async def client():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(payload)
+        await reader.readexactly(len(payload))
+        writer.close()
+        await writer.wait_closed()
+
+    async with server:
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--messages", type=int, default=200_000)
+    parser.add_argument("-c", "--clients", type=int, default=10)
+    args = parser.parse_args()
+    count = args.messages - args.messages % args.clients
+
+    print(f"{count:,} pipelined {FRAME_SIZE} byte echo messages, {args.clients} clients")
+    for handler_kind in ("sync", "async"):
+        for mode in ("streams", "protocol"):
+            app = make_app(mode, handler_kind)
+            with timed(f"{mode}, {handler_kind} handler", count, "msgs"):
+                asyncio.run(pipeline(app, count, args.clients))
+
+
+if __name__ == "__main__":
+    main()
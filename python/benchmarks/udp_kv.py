@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import multiprocessing
+import os
+import socket
+import socketserver
+import time
+from pathlib import Path
+
+SCRIPTS = Path(__file__).parent.parent
+LEGACY = SCRIPTS / "04-unusual-database-program-socketserver.py"
+ASYNCIO = SCRIPTS / "04-unusual-database-program-asyncio.py"
+TIMEOUT = 1.0  # seconds before a retrieve counts as lost
+
+
+def load_script(path: Path):
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def serve_legacy(sock: socket.socket):
+    module = load_script(LEGACY)
+    server = socketserver.ThreadingUDPServer(
+        sock.getsockname(), module.KeyValueStoreServer, bind_and_activate=False
+    )
+    server.socket.close()
+    server.socket = sock
+    server.max_packet_size = 1000
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        server.serve_forever()
+
+
+def serve_asyncio(sock: socket.socket):
+    module = load_script(ASYNCIO)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(module.KeyValueStoreProtocol, sock=sock)
+        await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+class LoadClient(asyncio.DatagramProtocol):
+    """Matches each retrieve response to its request by key."""
+
+    def __init__(self):
+        self.waiting: dict[bytes, asyncio.Future] = {}
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        key, _, _ = data.partition(b"=")
+        future = self.waiting.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+
+async def worker(transport, client: LoadClient, worker_id: int, requests: int):
+    latencies, lost = [], 0
+    for i in range(requests):
+        key = b"k%d.%d" % (worker_id, i)
+        transport.sendto(key + b"=" + b"v" * 32)  # insert, no reply
+        future = asyncio.get_running_loop().create_future()
+        client.waiting[key] = future
+        start = time.perf_counter()
+        transport.sendto(key)  # retrieve
+        try:
+            latencies.append(await asyncio.wait_for(future, TIMEOUT) - start)
+        except TimeoutError:
+            client.waiting.pop(key, None)
+            lost += 1
+    return latencies, lost
+
+
+async def load(address, clients: int, requests: int):
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(
+        LoadClient, remote_addr=address
+    )
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(worker(transport, client, i, requests) for i in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+    transport.close()
+
+    latencies = sorted(latency for result, _ in results for latency in result)
+    lost = sum(lost for _, lost in results)
+    packets = 2 * clients * requests
+    return packets / elapsed, latencies, lost
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--clients", type=int, default=32, help="in flight")
+    parser.add_argument("-n", "--requests", type=int, default=2_000, help="per client")
+    args = parser.parse_args()
+
+    print(
+        f"{args.clients} clients x {args.requests:,} insert + retrieve pairs, "
+        "p99 of the retrieves"
+    )
+    servers = {"ThreadingUDPServer": serve_legacy, "asyncio": serve_asyncio}
+    for label, serve in servers.items():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        server = multiprocessing.Process(target=serve, args=(sock,))
+        server.start()
+        time.sleep(0.5)  # let the server load its script
+
+        pps, latencies, lost = asyncio.run(
+            load(sock.getsockname(), args.clients, args.requests)
+        )
+        server.terminate()
+        server.join()
+        sock.close()
+
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(
+            f"  {label:<20} {pps:>10,.0f} packets/s  "
+            f"p50 {p50:6.2f}ms  p99 {p99:6.2f}ms  lost {lost}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import os
+import time
+from pathlib import Path
+
+from fastsocket.upstream import Upstream
+
+SCRIPT = Path(__file__).parent.parent / "05-mob-in-the-middle-asyncio.py"
+WELCOME = b"Welcome to budgetchat! What shall I call you?\n"
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("mob_in_the_middle", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Everything is on localhost, the round trip to a real upstream is simulated:
+# dialing takes one (the handshake), the greeting arrives half of one later.
+
+
+class Distant(Upstream):
+    def __init__(self, rtt: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rtt = rtt
+
+    async def resolve(self):
+        # called by dial() for every connection, the wait counts as dial time
+        await asyncio.sleep(self.rtt)
+        return await super().resolve()
+
+
+async def stand_in(rtt: float, reader, writer) -> None:
+    # Budget Chat greets right away
+    await asyncio.sleep(rtt / 2)
+    writer.write(WELCOME)
+    with contextlib.suppress(ConnectionError):  # closed warm connections reset
+        while await reader.read(4096):
+            pass
+    writer.close()
+
+
+def legacy_handle(module, rtt: float, address):
+    # the handle() 05-mob-in-the-middle-asyncio.py had before Upstream
+    async def handle(client_reader, client_writer):
+        await asyncio.sleep(rtt)
+        upstream_reader, upstream_writer = await asyncio.open_connection(*address)
+        await asyncio.gather(
+            module.forward(
+                client_reader, upstream_writer, module.transform, "client -> server"
+            ),
+            module.forward(
+                upstream_reader, client_writer, module.transform, "server -> client"
+            ),
+        )
+        client_writer.close()
+
+    return handle
+
+
+async def session(address) -> float:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(*address)
+    await reader.readline()
+    ttfb = time.perf_counter() - start
+    writer.close()
+    return ttfb
+
+
+async def measure(module, args, pooled: bool) -> list[float]:
+    rtt = args.rtt / 1000
+    upstream_server = await asyncio.start_server(
+        lambda r, w: stand_in(rtt, r, w), "127.0.0.1", 0
+    )
+    port = upstream_server.sockets[0].getsockname()[1]
+    if pooled:
+        module.upstream = Distant(rtt, "localhost", port)
+        module.upstream.fill()
+        handle = module.handle
+    else:
+        handle = legacy_handle(module, rtt, ("localhost", port))
+    proxy = await asyncio.start_server(handle, "127.0.0.1", 0)
+    address = proxy.sockets[0].getsockname()
+
+    await asyncio.sleep(2 * rtt)  # the pool dials its first connection
+    sessions = []
+    for _ in range(args.sessions):
+        sessions.append(asyncio.create_task(session(address)))
+        await asyncio.sleep(args.interval / 1000)
+    ttfbs = await asyncio.gather(*sessions)
+
+    if pooled:
+        module.upstream.close()
+    proxy.close()
+    upstream_server.close()
+    await asyncio.sleep(2 * rtt)  # the last sessions close on both ends
+    return sorted(ttfbs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--sessions", type=int, default=500)
+    parser.add_argument("--rtt", type=float, default=20, help="ms to the upstream")
+    args = parser.parse_args()
+    module = load_script()
+
+    for interval in (50, 10, 2):
+        args.interval = interval
+        print(
+            f"{args.sessions} sessions, one every {interval}ms, "
+            f"{args.rtt:.0f}ms to the upstream, time to the first byte"
+        )
+        for label, pooled in (("open_connection", False), ("Upstream", True)):
+            # forward() prints every line
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                ttfbs = asyncio.run(measure(module, args, pooled))
+            p50 = ttfbs[len(ttfbs) // 2] * 1000
+            p99 = ttfbs[int(len(ttfbs) * 0.99)] * 1000
+            print(f"  {label:<24} p50 {p50:7.2f}ms  p99 {p99:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
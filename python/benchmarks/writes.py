@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import socket
+
+from fastsocket import FastTCP
+from fastsocket.framing import FrameBuffer
+from fastsocket.main import CHUNK_SIZE
+
+from .transport import FRAME_SIZE, Echo
+
+PAYLOAD = b"I\x00\x00\x30\x39\x00\x00\x00\x65"
+
+
+class CountingSocket(socket.socket):
+    """A listening socket whose accepted connections count their send calls."""
+
+    sends = 0
+
+    def accept(self):
+        fd, addr = self._accept()
+        conn = CountingSocket(self.family, self.type, self.proto, fileno=fd)
+        return conn, addr
+
+    def send(self, *args):
+        CountingSocket.sends += 1
+        return super().send(*args)
+
+    def sendmsg(self, *args):
+        CountingSocket.sends += 1
+        return super().sendmsg(*args)
+
+
+class LegacyFastTCP(FastTCP):
+    """FastTCP with the write path it had before coalescing, one write per response."""
+
+    async def _handle_connection(self, reader, writer):
+        buffer = FrameBuffer()
+        while chunk := await reader.read(CHUNK_SIZE):
+            buffer.feed(chunk)
+            for route, request in self._requests(buffer):
+                response = route.func(request)
+                writer.write(response.to_bytes())
+                await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+
+async def echo(app: FastTCP, count: int) -> int:
+    sock = CountingSocket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    sock.setblocking(False)
+    server = await app.create_server(sock)
+
+    CountingSocket.sends = 0
+    async with server:
+        reader, writer = await asyncio.open_connection(*sock.getsockname())
+        writer.write(PAYLOAD * count)
+        await reader.readexactly(len(PAYLOAD) * count)
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.1)  # let the server side see the disconnect
+    return CountingSocket.sends
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--requests", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"send syscalls for {args.requests:,} pipelined echo requests")
+    apps = {
+        "per response write": LegacyFastTCP(),
+        "coalesced, streams": FastTCP(mode="streams"),
+        "coalesced, protocol": FastTCP(mode="protocol"),
+    }
+    for label, app in apps.items():
+
+        @app.handler(Echo, request_size=FRAME_SIZE)
+        def handler(request: Echo) -> Echo:
+            return request
+
+        sends = asyncio.run(echo(app, args.requests))
+        print(f"  {label:<24} {sends:>8,} sends")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 """FastSocket: build network servers, just like that. Based on Python type hints."""
 
+from .connection import Connection
+from .jsonline import JSONModel, use_json_backend
 from .main import FastTCP
+from .state import LocalBackend, ManagerBackend, StateBackend
 from .struct import (
+    NeedMore,
     Struct,
     byte,
     f32,
@@ -17,4 +21,5 @@ from .struct import (
     u32,
     u64,
 )
+from .timeseries import TimeSeries, timeseries_backend
 from .utils import get_ip, get_public_ip
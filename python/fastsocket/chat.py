@@ -0,0 +1,407 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import socket
+import zlib
+from collections import deque
+from typing import Literal
+
+from .framing import LineFramer
+
+OUTBOX_SIZE = 1024  # messages queued for a member before it counts as slow
+CHUNK_SIZE = 4096
+MAX_LOGIN = 1024  # bytes a client may send before its name line is complete
+HANDOFF_BATCH = 64  # sockets passed to a shard per message, SCM_RIGHTS allows 253
+HANDOFF_SIZE = 1 << 16  # bytes of a handoff message at most, what a shard reads
+WELCOME = b"Welcome to budgetchat! What shall I call you?\n"
+
+"""
+Chat rooms for asyncio servers, as used by Budget Chat.
+
+    room = Room(slow_consumer="disconnect")
+    member = Member(name, writer, room.outbox_size)
+    member.send(room.join(member))  # b"* The room contains: ...", others are told
+    room.broadcast(member, f"[{name}] hello\\n")
+    room.leave(member)
+    await member.close()  # or member.abort()
+
+A broadcast is encoded once and the same bytes object is put in the outbox of
+every member, a bounded queue emptied by the member's own writer task. Senders
+never wait on a socket, so a client that stops reading only holds up itself.
+The writer takes everything queued at once and sends it with one writelines.
+
+When a member's outbox is full, the room applies its slow consumer policy:
+"drop" skips the message for that member, "disconnect" aborts its connection
+and removes it from the room.
+
+Members are kept in a dict, so joins and leaves are O(1) lookups. The names
+for the "room contains" line are kept joined up too: a join appends a name, a
+leave cuts one out. That is a copy of the string at worst, never a join over
+every member.
+
+A Hub serves many rooms from several shard processes. The hub process only
+accepts connections and reads the name line, `room/name` or a bare `name` for
+the default room. Rooms are spread over the shards by a hash of their name, and
+the hub hands each client's socket to the shard that owns its room, over a unix
+socket with SCM_RIGHTS. Every client logged in during one loop iteration is
+passed to its shard in one sendmsg, or a few if what they sent past their name
+line makes one too big. The channels don't block: while a shard is
+slow to take its clients, they wait in the hub until its channel has room,
+and the hub goes on accepting. From then on the shard alone owns the
+connection, so leaving never crosses processes, and rooms never need locks.
+"""
+
+SlowConsumer = Literal["drop", "disconnect"]
+
+
+class Member:
+    __slots__ = (
+        "name",
+        "writer",
+        "outbox",
+        "outbox_size",
+        "wakeup",
+        "task",
+        "dropped",
+        "closed",
+    )
+
+    def __init__(
+        self, name: str, writer: asyncio.StreamWriter, outbox_size: int = OUTBOX_SIZE
+    ):
+        self.name = name
+        self.writer = writer
+        self.outbox: deque[bytes] = deque()
+        self.outbox_size = outbox_size
+        self.wakeup: asyncio.Future | None = None  # set while the writer is idle
+        self.task = asyncio.create_task(self._write_loop())
+        self.dropped = 0  # messages skipped because the outbox was full
+        self.closed = False
+
+    def send(self, data: bytes) -> bool:
+        """Queue data for the member, False if the outbox is full."""
+        if self.closed:
+            return True
+        if len(self.outbox) >= self.outbox_size:
+            self.dropped += 1
+            return False
+        self._push(data)
+        return True
+
+    async def close(self) -> None:
+        """Send whatever is still queued, then close the connection."""
+        if self.closed:
+            return
+        if not self.task.done():  # the writer stops on a connection error
+            self._push(b"")  # sentinel, after the pending messages
+        self.closed = True
+        try:
+            await self.task
+        except ConnectionError:
+            pass
+        self.writer.close()
+
+    def abort(self) -> None:
+        """Close the connection right away, dropping whatever is queued."""
+        self.closed = True
+        self.task.cancel()
+        self.writer.transport.abort()
+
+    def _push(self, data: bytes) -> None:
+        self.outbox.append(data)
+        if self.wakeup is not None:
+            self.wakeup.set_result(None)
+            self.wakeup = None
+
+    async def _write_loop(self) -> None:
+        # a deque and a future, asyncio.Queue costs 5x as much per message and
+        # a broadcast puts a message in every outbox of the room
+        outbox, writer = self.outbox, self.writer
+        loop = asyncio.get_running_loop()
+        while True:
+            if not outbox:
+                self.wakeup = loop.create_future()
+                await self.wakeup
+            batch = list(outbox)
+            outbox.clear()
+            writer.writelines(batch)
+            if not batch[-1]:
+                return
+            await writer.drain()
+
+
+class Room:
+    def __init__(
+        self, slow_consumer: SlowConsumer = "disconnect", outbox_size: int = OUTBOX_SIZE
+    ):
+        if slow_consumer not in ("drop", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer}")
+        self.slow_consumer = slow_consumer
+        self.outbox_size = outbox_size
+        self.members: dict[Member, None] = {}  # a set that keeps the join order
+        self.roster = ""  # "alice, bob", the names of the members
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def names(self) -> list[str]:
+        return [member.name for member in self.members]
+
+    def join(self, member: Member) -> bytes:
+        """Add member and announce it, returns the room contains line for it."""
+        roster = self.roster
+        self.broadcast(member, f"* {member.name} has entered the room\n")
+        self.members[member] = None
+        self.roster = f"{roster}, {member.name}" if roster else member.name
+        return f"* The room contains: {roster}\n".encode()
+
+    def leave(self, member: Member) -> None:
+        if member in self.members:
+            del self.members[member]
+            # names are alphanumeric, so ", name, " can only match that name
+            padded = f", {self.roster}, "
+            i = padded.find(f", {member.name}, ")
+            self.roster = (padded[:i] + padded[i + len(member.name) + 2 :])[2:-2]
+            self.broadcast(member, f"* {member.name} has left the room\n")
+
+    def broadcast(self, sender: Member | None, message: str) -> None:
+        """Send message to everyone in the room but sender."""
+        data = message.encode()
+        slow = []
+        # Member.send inlined, this runs once per member for every message
+        for member in self.members:
+            if member is sender or member.closed:
+                continue
+            outbox = member.outbox
+            if len(outbox) >= member.outbox_size:
+                member.dropped += 1
+                slow.append(member)
+                continue
+            outbox.append(data)
+            if member.wakeup is not None:
+                member.wakeup.set_result(None)
+                member.wakeup = None
+        if slow and self.slow_consumer == "disconnect":
+            for member in slow:
+                self.kick(member)
+
+    def kick(self, member: Member) -> None:
+        """Abort member's connection and remove it from the room."""
+        member.abort()
+        self.leave(member)
+
+
+def parse_login(line: bytes, default_room: str) -> tuple[str, str] | None:
+    """(room, name) from a `room/name` or `name` line, None if it's not valid."""
+    try:
+        text = line.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return None
+    room, _, name = text.rpartition("/")
+    room = room or default_room
+    # only allow alphanumeric characters and don't allow empty names
+    if not name.isalnum() or not room.isalnum():
+        return None
+    return room, name
+
+
+def pack_handoffs(handoffs: list, start: int) -> tuple[list, bytes]:
+    """
+    The logins to pass on next from handoffs[start:], pickled, as many as fit in
+    HANDOFF_SIZE bytes and HANDOFF_BATCH sockets.
+    """
+    count = min(HANDOFF_BATCH, len(handoffs) - start)
+    while True:
+        batch = handoffs[start : start + count]
+        data = pickle.dumps([login for login, _ in batch])
+        # a single login is at most MAX_LOGIN + CHUNK_SIZE bytes, it always fits
+        if len(data) <= HANDOFF_SIZE or count == 1:
+            return batch, data
+        count //= 2
+
+
+class Shard:
+    """Runs in its own process, serving the rooms the hub sends clients for."""
+
+    def __init__(self, channel: socket.socket, slow_consumer, outbox_size: int):
+        self.channel = channel
+        self.slow_consumer = slow_consumer
+        self.outbox_size = outbox_size
+        self.rooms: dict[str, Room] = {}
+        self.stopped: asyncio.Future | None = None
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.stopped = loop.create_future()
+        self.channel.setblocking(False)
+        loop.add_reader(self.channel.fileno(), self._receive)
+        await self.stopped
+
+    def _receive(self) -> None:
+        try:
+            data, fds, flags, _ = socket.recv_fds(
+                self.channel, HANDOFF_SIZE, HANDOFF_BATCH
+            )
+        except BlockingIOError:
+            return
+        if not data:  # the hub is gone
+            asyncio.get_running_loop().remove_reader(self.channel.fileno())
+            self.stopped.set_result(None)
+            return
+        if flags & (socket.MSG_TRUNC | socket.MSG_CTRUNC):
+            print(f"Handoff of {len(fds)} clients cut short, dropping them")
+            for fd in fds:
+                os.close(fd)
+            return
+        for (room, name, leftover), fd in zip(pickle.loads(data), fds):
+            asyncio.create_task(self._serve_member(room, name, leftover, fd))
+
+    async def _serve_member(self, room_name: str, name: str, leftover: bytes, fd):
+        loop = asyncio.get_running_loop()
+        # what the hub read past the name line goes first, ahead of the socket
+        reader = asyncio.StreamReader()
+        reader.feed_data(leftover)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        sock = socket.socket(fileno=fd)
+        transport, _ = await loop.connect_accepted_socket(lambda: protocol, sock)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+
+        room = self.rooms.get(room_name)
+        if room is None:
+            room = self.rooms[room_name] = Room(self.slow_consumer, self.outbox_size)
+        member = Member(name, writer, room.outbox_size)
+        member.send(room.join(member))
+
+        framer = LineFramer()
+        try:
+            while chunk := await reader.read(CHUNK_SIZE):
+                for line in framer.feed(chunk):
+                    room.broadcast(member, f"[{name}] {line.decode('utf-8').strip()}\n")
+        except (ConnectionError, ValueError):  # reset, or not utf-8, or too long
+            pass
+
+        room.leave(member)
+        # the room may be gone already, or replaced by a new one of that name
+        if not room and self.rooms.get(room_name) is room:
+            del self.rooms[room_name]
+        await member.close()
+
+
+def run_shard(channel: socket.socket, slow_consumer, outbox_size: int) -> None:
+    try:
+        asyncio.run(Shard(channel, slow_consumer, outbox_size).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class Hub:
+    def __init__(
+        self,
+        shards: int | None = None,
+        default_room: str = "budgetchat",
+        slow_consumer: SlowConsumer = "disconnect",
+        outbox_size: int = OUTBOX_SIZE,
+    ):
+        self.shards = shards or os.cpu_count() or 1
+        self.default_room = default_room
+        self.slow_consumer = slow_consumer
+        self.outbox_size = outbox_size
+        self.channels: list[socket.socket] = []
+        self.processes: list[multiprocessing.Process] = []
+        # logged in clients waiting to be passed on, per shard
+        self.handoffs: list[list[tuple[tuple[str, str, bytes], socket.socket]]] = []
+        self.flush_scheduled = False
+        self.blocked: set[int] = set()  # shards whose channel is full
+
+    def start(self) -> None:
+        """Fork the shard processes, before the hub's event loop starts."""
+        for _ in range(self.shards):
+            # SOCK_SEQPACKET keeps each batch one message, fds and all
+            hub_end, shard_end = socket.socketpair(
+                socket.AF_UNIX, socket.SOCK_SEQPACKET
+            )
+            process = multiprocessing.Process(
+                target=run_shard,
+                args=(shard_end, self.slow_consumer, self.outbox_size),
+                daemon=True,
+            )
+            process.start()
+            shard_end.close()
+            hub_end.setblocking(False)
+            self.channels.append(hub_end)
+            self.processes.append(process)
+            self.handoffs.append([])
+
+    async def serve(self, sock: socket.socket) -> None:
+        """Accept clients on sock, which must be listening and non blocking."""
+        if not self.processes:
+            self.start()
+        loop = asyncio.get_running_loop()
+        while True:
+            conn, _ = await loop.sock_accept(sock)
+            conn.setblocking(False)
+            asyncio.create_task(self._login(conn))
+
+    def shard_of(self, room: str) -> int:
+        return zlib.crc32(room.encode()) % self.shards
+
+    async def _login(self, conn: socket.socket) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.sock_sendall(conn, WELCOME)
+            data = b""
+            while b"\n" not in data and len(data) < MAX_LOGIN:
+                chunk = await loop.sock_recv(conn, CHUNK_SIZE)
+                if not chunk:
+                    break
+                data += chunk
+        except ConnectionError:
+            conn.close()
+            return
+
+        line, newline, leftover = data.partition(b"\n")
+        login = parse_login(line, self.default_room) if newline else None
+        if login is None:
+            if newline:
+                conn.send(b"Illegal Name!\n")
+            conn.close()
+            return
+
+        room, name = login
+        self.handoffs[self.shard_of(room)].append(((room, name, leftover), conn))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self.flush_scheduled = False
+        for shard in range(self.shards):
+            if shard not in self.blocked:
+                self._send(shard)
+
+    def _send(self, shard: int) -> None:
+        channel, handoffs = self.channels[shard], self.handoffs[shard]
+        loop = asyncio.get_running_loop()
+        sent = 0
+        while sent < len(handoffs):
+            batch, data = pack_handoffs(handoffs, sent)
+            try:
+                socket.send_fds(channel, [data], [conn.fileno() for _, conn in batch])
+            except BlockingIOError:
+                # a seqpacket goes whole or not at all, retry once the shard reads
+                if shard not in self.blocked:
+                    self.blocked.add(shard)
+                    loop.add_writer(channel, self._send, shard)
+                break
+            except OSError as e:
+                # these clients are lost, the ones queued after them are not
+                print(f"Handoff to shard {shard} failed: {e!r}")
+            for _, conn in batch:
+                conn.close()  # the shard has its own copy of the descriptor
+            sent += len(batch)
+        else:
+            if shard in self.blocked:
+                self.blocked.discard(shard)
+                loop.remove_writer(channel)
+        del handoffs[:sent]
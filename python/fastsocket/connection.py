@@ -0,0 +1,49 @@
+from typing import Any
+
+"""
+Per-client state for FastTCP handlers.
+
+    class Client(Connection):
+        __slots__ = ("name",)
+
+        def __init__(self, writer, peername):
+            super().__init__(writer, peername)
+            self.name = None
+
+    app = FastTCP(connection=Client)
+
+    @app.handler(Hello)
+    def hello(request: Hello, client: Client) -> Welcome:
+        client.name = request.name
+        ...
+
+    @app.on_disconnect
+    def bye(client: Client) -> None:
+        ...
+
+A handler that takes a second parameter gets the Connection of the client the
+request came from, one instance for the whole life of the connection. Its
+writer is the StreamWriter (mode="streams") or the transport (mode="protocol"),
+to send something that isn't a response, like a message for another client.
+
+Connections are created for every client, so they use __slots__ and hold
+nothing until a handler puts something there: subclasses should declare
+__slots__ too, or every instance gets a __dict__ back. close() disconnects the
+client once the responses already produced are sent.
+
+on_connect and on_disconnect hooks are plain functions, called with the
+Connection right when the client connects and after it is gone.
+"""
+
+
+class Connection:
+    __slots__ = ("writer", "peername", "closing")
+
+    def __init__(self, writer: Any, peername: Any):
+        self.writer = writer
+        self.peername = peername
+        self.closing = False
+
+    def close(self) -> None:
+        """Disconnect after sending the responses to the requests so far."""
+        self.closing = True
@@ -9,7 +9,7 @@ class Message(Struct):
 
     @classmethod
     def from_bytes(cls, data: bytes) -> "Message":
-        return cls(message=data.decode())
+        return cls(message=str(data, "utf-8"))
 
     def to_bytes(self) -> bytes:
         return f"{self.message}\n".encode()
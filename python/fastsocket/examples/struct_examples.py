@@ -52,7 +52,7 @@ numbers = Numbers(
     f=123456789,
     g=-1234567890123456789,
     h=1234567890123456789,
-    i=3.14,
+    i=3.125,  # 3.14 would come back as 3.140000104904175 from a float
     j=2.718281828,
     k=True,
     m=255,
@@ -67,7 +67,7 @@ iterables = Iterables(
 other = Other(empty_string="a")  # all defaults
 
 for x in (numbers, iterables, other):
-    # encoded = x.encode()
-    # decoded = x.__class__.decode(encoded)
-    # assert x == decoded, x
+    encoded = x.encode()
+    decoded = x.__class__.decode(encoded)
+    assert x == decoded, x
     print_hex(x)
@@ -0,0 +1,231 @@
+from typing import Any, Callable, Iterator
+
+from .struct import NeedMore
+
+COMPACT_THRESHOLD = 64 * 1024
+MAX_LINE = 64 * 1024  # LineFramer's default, bytes before a line is refused
+SHORT_LINE = 512  # LineFramer splits lines shorter than this, finds longer ones
+
+"""
+A FrameBuffer keeps one growable bytearray and a read cursor into it.
+
+Frames are handed out as memoryview slices of that buffer, so no bytes are copied
+while framing. A frame is only valid until the next call to feed(), callers that
+want to keep one around should copy it with bytes(frame).
+
+The consumed prefix of the buffer is only dropped (compacted) when it is either
+all of the buffer, or large enough to be worth the memmove.
+
+A LineFramer is for the line based servers that want their lines as bytes: all
+the lines of a chunk are cut out of it in one pass, each copied once, and only
+the unfinished line at its end is kept back. A line arriving over many chunks
+is kept as the list of those chunks, joined once when it ends, and is never
+searched for the delimiter again.
+"""
+
+
+class UnknownTag(ValueError):
+    def __init__(self, tag: int):
+        super().__init__(f"Unknown message tag: {tag:#04x}")
+        self.tag = tag
+
+
+class LineTooLong(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"Line longer than {limit} bytes")
+        self.limit = limit
+
+
+class LineFramer:
+    """
+    Splits a byte stream into lines, without their delimiter.
+
+        framer = LineFramer(max_line=1024)
+        while chunk := sock.recv(4096):
+            for line in framer.feed(chunk):
+                ...
+
+    feed() returns every line the chunk completes, and raises LineTooLong once
+    a line passes max_line bytes, finished or not, so a client can't make the
+    server buffer without bound.
+    """
+
+    __slots__ = ("delimiter", "max_line", "_pieces", "_size")
+
+    def __init__(self, max_line: int = MAX_LINE, delimiter: bytes = b"\n"):
+        self.delimiter = delimiter
+        self.max_line = max_line
+        # the unfinished line, one piece per chunk, joined once it is complete
+        self._pieces: list[bytes] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        delimiter = self.delimiter
+        pieces = self._pieces
+        if len(delimiter) > 1 and pieces:
+            # the delimiter may begin in the unfinished line
+            chunk = b"".join(pieces) + chunk
+            pieces.clear()
+            self._size = 0
+
+        find = chunk.find
+        idx = find(delimiter)
+        if idx == -1:
+            pieces.append(chunk)
+            self._size += len(chunk)
+            if self._size > self.max_line:
+                raise LineTooLong(self.max_line)
+            return []
+
+        step = len(delimiter)
+        lines = []
+        pos = 0
+        if pieces:
+            pieces.append(chunk[:idx])
+            lines.append(b"".join(pieces))
+            pieces.clear()
+            pos = idx + step
+            idx = find(delimiter, pos)
+        while idx != -1:
+            if idx - pos < SHORT_LINE:
+                # bytes.split() is fastest over short lines, but compares byte by
+                # byte, where find() is a memchr
+                rest = (chunk[pos:] if pos else chunk).split(delimiter)
+                tail = rest.pop()
+                lines += rest
+                break
+            lines.append(chunk[pos:idx])
+            pos = idx + step
+            idx = find(delimiter, pos)
+        else:
+            tail = chunk[pos:] if pos else chunk
+        if tail:
+            pieces.append(tail)
+        self._size = len(tail)
+
+        # a line can only be too long if the chunk was, or it began earlier
+        if len(chunk) > self.max_line or len(lines[0]) > self.max_line:
+            if max(map(len, lines)) > self.max_line:
+                raise LineTooLong(self.max_line)
+        if self._size > self.max_line:
+            raise LineTooLong(self.max_line)
+        return lines
+
+
+class FrameBuffer:
+    __slots__ = ("_buf", "_pos", "_scan")
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0  # start of the first unconsumed byte
+        # where to resume looking for a delimiter, or how far the buffer has to
+        # reach before a partial message is worth decoding again
+        self._scan = 0
+
+    def __len__(self) -> int:
+        return len(self._buf) - self._pos
+
+    def feed(self, chunk: bytes) -> None:
+        buf, pos = self._buf, self._pos
+        try:
+            if pos == len(buf):
+                # everything was consumed, start over at the beginning
+                buf.clear()
+                self._pos = self._scan = 0
+            elif pos >= COMPACT_THRESHOLD and pos * 2 >= len(buf):
+                del buf[:pos]
+                self._scan -= pos
+                self._pos = 0
+            buf += chunk
+        except BufferError:
+            # a frame handed out earlier is still alive and pins the old buffer,
+            # leave it to that frame and continue in a fresh buffer.
+            self._buf = bytearray(memoryview(buf)[pos:])
+            self._buf += chunk
+            self._scan -= pos
+            self._pos = 0
+
+    def frames_sized(self, size: int) -> Iterator[memoryview]:
+        """Yield every complete frame of exactly `size` bytes."""
+        buf = self._buf
+        end = len(buf)
+        pos = self._pos
+        if end - pos < size:
+            return
+
+        view = memoryview(buf)
+        while end - pos >= size:
+            self._pos = pos + size
+            yield view[pos : pos + size]
+            pos = self._pos
+        self._scan = pos
+
+    def frames_delimited(self, delimiter: bytes) -> Iterator[memoryview]:
+        """Yield every complete frame ending in `delimiter`, without the delimiter."""
+        buf = self._buf
+        find = buf.find
+        step = len(delimiter)
+        pos = self._pos
+        idx = find(delimiter, max(self._scan, pos))
+        if idx == -1:
+            self._scan = max(pos, len(buf) - step + 1)
+            return
+
+        view = memoryview(buf)
+        while idx != -1:
+            self._pos = idx + step
+            yield view[pos:idx]
+            pos = self._pos
+            idx = find(delimiter, pos)
+        self._scan = max(pos, len(buf) - step + 1)
+
+    def messages(self, decode_from: Callable) -> Iterator[Any]:
+        """
+        Yield every complete message decoded by `decode_from` (see
+        Struct.decode_from), the buffer is never sliced or copied to do it.
+        """
+        buf = self._buf
+        end = len(buf)
+        pos = self._pos
+        if end < self._scan or pos == end:
+            return
+
+        view = memoryview(buf)
+        while pos < end:
+            result = decode_from(view, pos)
+            if type(result) is NeedMore:
+                self._scan = end + result.size
+                return
+            message, size = result
+            pos = self._pos = pos + size
+            yield message
+        self._scan = pos
+
+    def tagged_messages(self, routes: list) -> Iterator[tuple[Any, Any]]:
+        """
+        Like messages(), but the first byte of every message is an index into
+        `routes`, a 256 entry table of objects with a decode_from. Yields
+        (route, message) pairs, and raises UnknownTag for a None entry.
+        """
+        buf = self._buf
+        end = len(buf)
+        pos = self._pos
+        if end < self._scan or pos == end:
+            return
+
+        view = memoryview(buf)
+        while pos < end:
+            route = routes[buf[pos]]
+            if route is None:
+                raise UnknownTag(buf[pos])
+            result = route.decode_from(view, pos)
+            if type(result) is NeedMore:
+                self._scan = end + result.size
+                return
+            message, size = result
+            pos = self._pos = pos + size
+            yield route, message
+        self._scan = pos
@@ -0,0 +1,219 @@
+import json
+import re
+import types
+from typing import Any, ClassVar, Literal, Self, Union, get_args, get_origin
+
+"""
+JSON line protocol models, one JSON object per line.
+
+    class Request(JSONModel):
+        method: Literal["isPrime"]
+        number: int | float
+
+    Request.from_bytes(b'{"method":"isPrime","number":7}')  # validated Request
+    Request(method="isPrime", number=7).to_bytes()  # b'{...}\n'
+
+Like Struct, everything per class is done once by the metaclass: the field set
+used to drop unknown keys, and a generated validating constructor.
+
+The JSON backend is picked once at import, the fastest installed of msgspec,
+orjson and the stdlib json, use_json_backend() overrides it. The fast backends
+only handle 64 bit integers (orjson even turns bigger ones into floats), so a
+document with a number of 19 or more digits is left to the stdlib.
+"""
+
+BIG_NUMBER = re.compile(rb"\d{19}")
+
+
+class JSONBackend:
+    def __init__(self, name: str, loads, dumps):
+        self.name = name
+        self.loads = loads  # bytes | str -> Any
+        self.dumps = dumps  # Any -> bytes
+
+
+def _stdlib_backend() -> JSONBackend:
+    encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+    return JSONBackend("json", loads, lambda obj: encoder.encode(obj).encode())
+
+
+def _orjson_backend() -> JSONBackend:
+    import orjson
+
+    def loads(data):
+        if isinstance(data, str):
+            data = data.encode()
+        if BIG_NUMBER.search(data):
+            return json.loads(bytes(data))
+        return orjson.loads(data)
+
+    return JSONBackend("orjson", loads, orjson.dumps)
+
+
+def _msgspec_backend() -> JSONBackend:
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def loads(data):
+        if isinstance(data, str):
+            data = data.encode()
+        if BIG_NUMBER.search(data):
+            return json.loads(bytes(data))
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None
+
+    return JSONBackend("msgspec", loads, encoder.encode)
+
+
+BACKENDS = {
+    "msgspec": _msgspec_backend,
+    "orjson": _orjson_backend,
+    "json": _stdlib_backend,
+}
+
+
+def use_json_backend(name: str | None = None) -> JSONBackend:
+    """Switch every JSONModel to backend `name`, or the fastest one installed."""
+    global backend
+    if name and name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+
+    for candidate in [name] if name else list(BACKENDS):
+        try:
+            backend = BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        return backend
+    raise AssertionError("the stdlib backend is always available")
+
+
+backend: JSONBackend = use_json_backend()
+
+
+def type_check(field: str, field_type: Any) -> str:
+    """Python expression checking the value `v` against `field_type`."""
+    if field_type is Any:
+        return "True"
+
+    origin = get_origin(field_type)
+    if origin is Literal:
+        return f"v in {get_args(field_type)!r}"
+
+    if origin in (Union, types.UnionType):
+        return " or ".join(f"({type_check(field, t)})" for t in get_args(field_type))
+
+    if field_type in (int, float):
+        # bool is an int to isinstance, but not a number to JSON
+        return f"isinstance(v, {field_type.__name__}) and type(v) is not bool"
+
+    if field_type in (str, bool, list, dict) or origin in (list, dict):
+        return f"isinstance(v, {(origin or field_type).__name__})"
+
+    if field_type is None or field_type is type(None):
+        return "v is None"
+
+    raise TypeError(f"Unsupported type: {field} {field_type}")
+
+
+def make_validator(
+    name: str, fields: list[str], field_types: list[Any], defaults: dict
+):
+    """Generate from_dict(cls, data), which checks every field and builds the model."""
+    env: dict[str, Any] = {"_MISSING": object(), "defaults": defaults}
+    lines = [
+        "def from_dict(cls, data):",
+        "    if type(data) is not dict:",
+        f"        raise ValueError('{name} must be a JSON object')",
+        "    self = object.__new__(cls)",
+    ]
+    for field, field_type in zip(fields, field_types):
+        if field in defaults:
+            lines.append(f"    v = data.get({field!r}, defaults[{field!r}])")
+        else:
+            lines.append(f"    v = data.get({field!r}, _MISSING)")
+            lines.append("    if v is _MISSING:")
+            lines.append(f"        raise ValueError('Missing {name}.{field}')")
+        lines.append(f"    if not ({type_check(field, field_type)}):")
+        lines.append(f"        raise ValueError(f'Invalid {name}.{field}: {{v!r}}')")
+        lines.append(f"    self.{field} = v")
+    lines.append("    return self")
+
+    exec(compile("\n".join(lines), f"<{name} validator>", "exec"), env)
+    env["from_dict"].__qualname__ = f"{name}.from_dict"
+    return env["from_dict"]
+
+
+class JSONModelMeta(type):
+    def __new__(mcs, name, bases, namespace):
+        annotations = namespace.get("__annotations__", {})
+        model_fields = []
+        model_types = []
+        for field_name, field_type in annotations.items():
+            if get_origin(field_type) is ClassVar:
+                continue
+            model_fields.append(field_name)
+            model_types.append(field_type)
+        model_defaults = {k: namespace.pop(k) for k in model_fields if k in namespace}
+
+        def make_init(model_fields, model_defaults):
+            def __init__(self, **data):
+                for field in model_fields:
+                    if field in data:
+                        setattr(self, field, data[field])
+                    elif field in model_defaults:
+                        setattr(self, field, model_defaults[field])
+                    else:
+                        raise TypeError(f"Missing required argument: {field}")
+
+            return __init__
+
+        namespace["model_fields"] = tuple(model_fields)
+        namespace["model_defaults"] = model_defaults
+        namespace["__slots__"] = tuple(model_fields)
+        namespace["__init__"] = make_init(model_fields, model_defaults)
+        namespace["from_dict"] = classmethod(
+            make_validator(name, model_fields, model_types, model_defaults)
+        )
+
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class JSONModel(metaclass=JSONModelMeta):
+    model_fields: ClassVar[tuple[str, ...]]
+    model_defaults: ClassVar[dict[str, Any]]
+
+    def __init__(self, **data: Any): ...
+    @classmethod
+    def from_dict(cls, data: Any) -> Self: ...
+
+    @classmethod
+    def from_bytes(cls, data: bytes | str) -> Self:
+        """Parse and validate one line, raises ValueError if it is malformed."""
+        return cls.from_dict(backend.loads(data))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.model_fields}
+
+    def to_bytes(self) -> bytes:
+        return backend.dumps(self.to_dict()) + b"\n"
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
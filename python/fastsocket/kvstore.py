@@ -0,0 +1,191 @@
+import os
+import struct
+from collections import OrderedDict
+
+ENTRY_OVERHEAD = 120  # bytes a key/value pair costs beyond its contents, roughly
+COMPACT_RATIO = 2  # rewrite the log once it is this many times the live data
+COMPACT_MIN = 1 << 20  # ... and at least this big
+READ_SIZE = 1 << 24
+
+"""
+Key/value storage for the Unusual Database Program, bounded and persistent.
+
+    store = KVStore("kv.log", max_bytes=256 << 20)
+    store.set(b"foo", b"bar")
+    store.get(b"foo")  # b"bar"
+
+max_bytes: a memory budget for the pairs, estimated as their lengths plus
+    ENTRY_OVERHEAD. Past it the least recently used pairs are evicted, the
+    pairs live in an OrderedDict so a lookup moves its pair to the end in O(1).
+    Without a budget it is a plain dict, and lookups don't reorder anything.
+path: every set() is appended to this log, as a "!HH" key and value length
+    followed by both. Opening the store replays the log, a record cut short by
+    a crash is dropped. compact() rewrites the log with only the pairs a
+    restart would recover, should_compact() says when it has grown
+    COMPACT_RATIO times their size, as overwritten and evicted pairs pile up.
+
+Writes go through a buffered file, flush() hands them to the OS. The server
+calls flush() periodically, not on the per-packet path.
+
+Compacting a big log takes seconds, a server does it in three steps to keep
+serving meanwhile:
+
+    size = store.start_compaction()  # the log so far, sets are kept aside
+    size = await asyncio.to_thread(compact_log, store.path, size, store.max_bytes)
+    store.finish_compaction(size)  # appends what was kept aside, swaps the log
+
+compact_log() replays the log into a store of its own, it doesn't touch the
+one serving requests. Until the swap the old log stays the one a restart
+recovers from.
+"""
+
+HEADER = struct.Struct("!HH")
+
+
+class KVStore:
+    def __init__(self, path: str | None = None, max_bytes: int | None = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.items: dict[bytes, bytes] = OrderedDict() if max_bytes else {}
+        self.live = 0  # log bytes of the pairs in items, what compaction leaves
+        self.evicted = 0
+        self.log = None
+        self.log_bytes = 0
+        self.since: list[bytes] | None = None  # records set while compacting
+
+        if path is not None:
+            self.log_bytes = self._recover(path)
+            self.log = open(path, "ab")
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key: bytes, default: bytes | None = None) -> bytes | None:
+        value = self.items.get(key)
+        if value is None:
+            return default
+        if self.max_bytes:
+            self.items.move_to_end(key)
+        return value
+
+    def set(self, key: bytes, value: bytes) -> None:
+        self._put(key, value)
+        if self.log is not None:
+            record = HEADER.pack(len(key), len(value)) + key + value
+            self.log.write(record)
+            self.log_bytes += len(record)
+            if self.since is not None:
+                self.since.append(record)
+
+    def flush(self) -> None:
+        if self.log is not None:
+            self.log.flush()
+
+    def should_compact(self) -> bool:
+        """Whether the log has grown enough to compact, and isn't being already."""
+        if self.log is None or self.since is not None:
+            return False
+        return self.log_bytes >= max(COMPACT_MIN, COMPACT_RATIO * self.live)
+
+    def compact(self) -> None:
+        """Rewrite the log with the live pairs only, replacing it atomically."""
+        size = self.start_compaction()
+        self.finish_compaction(compact_log(self.path, size, self.max_bytes))
+
+    def start_compaction(self) -> int:
+        """Flush the log and start keeping new sets aside, returns its size."""
+        self.flush()
+        self.since = []
+        return self.log_bytes
+
+    def finish_compaction(self, size: int) -> None:
+        """Swap in the log compact_log() wrote, `size` bytes long."""
+        since, self.since = self.since, None
+        compacted = f"{self.path}.compact"
+        with open(compacted, "ab") as f:
+            f.writelines(since)
+            f.flush()
+            os.fsync(f.fileno())
+        self.log.close()
+        os.replace(compacted, self.path)
+        self.log = open(self.path, "ab")
+        self.log_bytes = size + sum(map(len, since))
+
+    def cancel_compaction(self) -> None:
+        self.since = None
+
+    def close(self) -> None:
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def _put(self, key: bytes, value: bytes) -> None:
+        items = self.items
+        old = items.get(key)
+        if old is not None:
+            self.live -= HEADER.size + len(key) + len(old)
+            if self.max_bytes:
+                items.move_to_end(key)
+        items[key] = value
+        self.live += HEADER.size + len(key) + len(value)
+
+        if self.max_bytes:
+            while self.live + ENTRY_OVERHEAD * len(items) > self.max_bytes:
+                evicted, old = items.popitem(last=False)
+                self.live -= HEADER.size + len(evicted) + len(old)
+                self.evicted += 1
+
+    def _recover(self, path: str, limit: int | None = None) -> int:
+        """Replay the log, or its first `limit` bytes, returns the valid length."""
+        if not os.path.exists(path):
+            return 0
+
+        # without a budget there is nothing to evict, fill the dict directly
+        items = self.items
+        put = self._put if self.max_bytes else items.__setitem__
+        unpack, size = HEADER.unpack_from, HEADER.size
+        valid = 0
+        tail = b""
+        remaining = os.path.getsize(path) if limit is None else limit
+        with open(path, "rb") as f:
+            while remaining > 0 and (chunk := f.read(min(READ_SIZE, remaining))):
+                remaining -= len(chunk)
+                data = tail + chunk
+                pos, end = 0, len(data)
+                while pos + size <= end:
+                    key_size, value_size = unpack(data, pos)
+                    start = pos + size
+                    stop = start + key_size + value_size
+                    if stop > end:
+                        break
+                    put(data[start : start + key_size], data[start + key_size : stop])
+                    pos = stop
+                valid += pos
+                tail = data[pos:]
+
+        if not self.max_bytes:
+            keys, values = sum(map(len, items)), sum(map(len, items.values()))
+            self.live = size * len(items) + keys + values
+        if tail and limit is None:  # a record cut short, died while writing it
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        return valid
+
+
+def compact_log(path: str, size: int, max_bytes: int | None = None) -> int:
+    """
+    Write the pairs the first `size` bytes of the log at path hold, as recovered
+    with max_bytes, to path + ".compact". Returns its size. It only reads the
+    log, so it can run in a thread while the store keeps appending to it.
+    """
+    store = KVStore(max_bytes=max_bytes)
+    store._recover(path, size)
+    pack = HEADER.pack
+    with open(f"{path}.compact", "wb") as f:
+        f.writelines(
+            pack(len(key), len(value)) + key + value
+            for key, value in store.items.items()
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    return store.live
@@ -1,11 +1,22 @@
 import asyncio
 import inspect
 import socket
-from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Literal
+
+from .connection import Connection
+from .framing import FrameBuffer, UnknownTag
+from .protocol import FastTCPProtocol
+from .state import LocalBackend, StateBackend
+from .struct import u8
+from .utils import get_ip
+from .workers import supervise
 
 HOST = "::"
 PORT = 9001
 CHUNK_SIZE = 4096
+WRITE_HIGH_WATER = 64 * 1024  # bytes buffered for a client before we stop reading
+OFFLOAD_BATCH = 64  # requests shipped to the process pool at once
 
 
 """
@@ -17,33 +28,135 @@ parse request, using either size or delimiter, and from_bytes
 response = handler(request)
 send response, encode using to_bytes
 
+Responses to all the requests that arrived in one read are gathered and sent
+with a single writelines, so pipelined requests cost one send per batch. A
+client is only waited on (drain, or pause_reading in protocol mode) once more
+than write_high_water bytes are buffered for it.
+
+Protocols with several message types (Struct models starting with a
+`message_type: u8` default) can register one handler per model. The first byte
+of a message is an index into a 256 entry table of routes, unknown tags are
+answered with on_unknown_tag(tag) and disconnected.
+
+mode="streams" uses asyncio.start_server, one reader/writer pair per connection.
+mode="protocol" uses loop.create_server with FastTCPProtocol, which frames and
+handles requests right in data_received.
+
+CPU heavy handlers can be registered with executor="process". Their requests are
+shipped to a ProcessPoolExecutor in batches of consecutive requests, instead of
+being run on the event loop. A connection has at most one batch in flight, which
+keeps its responses in order and stops one client from taking the whole pool.
+
+A handler taking a second parameter also gets the client's Connection, an
+instance of FastTCP(connection=...) made when it connects (see connection.py).
+Functions registered with @app.on_connect and @app.on_disconnect are called
+with it as the client comes and goes.
+
+run(workers=N) forks N processes, each binding its own SO_REUSEPORT socket and
+running its own loop. State shared between connections lives in app.state, which
+must be a shared backend (see state.py) to run more than one worker.
+
 FUTURE SCOPE:
 1. use a serialization library like msgspec
 """
 
 
+class Route:
+    __slots__ = (
+        "model",
+        "func",
+        "is_async",
+        "decode_from",
+        "executor",
+        "takes_connection",
+    )
+
+    def __init__(self, model, func: Callable, executor: str | None = None):
+        self.model = model
+        self.func = func
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.decode_from = getattr(model, "decode_from", None)
+        self.executor = executor
+        self.takes_connection = len(inspect.signature(func).parameters) > 1
+
+
+def run_batch(func: Callable, requests: list) -> list:
+    """Runs in the process pool."""
+    return [func(request) for request in requests]
+
+
 class FastTCP:
-    def __init__(self, host: str = HOST, port: int = PORT):
+    def __init__(
+        self,
+        host: str = HOST,
+        port: int = PORT,
+        mode: Literal["streams", "protocol"] = "streams",
+        state: StateBackend | None = None,
+        on_unknown_tag: Callable[[int], Any] | None = None,
+        write_high_water: int = WRITE_HIGH_WATER,
+        process_workers: int | None = None,
+        connection: type[Connection] = Connection,
+    ):
+        if mode not in ("streams", "protocol"):
+            raise ValueError(f"Unknown mode: {mode}")
+
         self.host = host
         self.port = port
+        self.mode = mode
+        self.state = state if state is not None else LocalBackend()
+        self.on_unknown_tag = on_unknown_tag
+        self.write_high_water = write_high_water
+        self.process_workers = process_workers
+        self.pool: ProcessPoolExecutor | None = None  # created on first use
+        self.offload_batch = OFFLOAD_BATCH
+        self.connection = connection
+        self.connect_hooks: list[Callable[[Connection], None]] = []
+        self.disconnect_hooks: list[Callable[[Connection], None]] = []
+
+        self.route: Route | None = None  # the handler, for single message protocols
+        self.routes: list[Route | None] | None = None  # indexed by message tag
 
     def handler(
         self,
         model,
         request_size: int | None = None,
         request_delimiter: bytes | None = None,
+        executor: Literal["process"] | None = None,
     ):
         def decorator(func: Callable):
-            self.handler_func = func
             sig = inspect.signature(func)
             self.request_type = sig.parameters[
                 list(sig.parameters.keys())[0]
             ].annotation
             self.response_type = sig.return_annotation
+            route = Route(self.request_type, func, executor)
+
+            if executor not in (None, "process"):
+                raise ValueError(f"Unknown executor: {executor}")
+            if executor and route.is_async:
+                raise Exception("Only plain functions can run in the process pool")
+            if executor and route.takes_connection:
+                raise Exception("Handlers in the process pool can't take a connection")
 
-            if not (request_size or request_delimiter):
+            # models that can find their own end in a stream (Struct) don't need
+            # a size or delimiter, they are decoded straight from the buffer
+            if not (request_size or request_delimiter) and route.decode_from is None:
                 raise Exception("One of size or delimiter is required")
 
+            tag = message_tag(self.request_type)
+            if request_size or request_delimiter or tag is None:
+                if self.routes is not None:
+                    raise Exception("Can't mix tagged and untagged handlers")
+                self.route = route
+            else:
+                if self.route is not None:
+                    raise Exception("Can't mix tagged and untagged handlers")
+                if self.routes is None:
+                    self.routes = [None] * 256
+                if self.routes[tag] is not None:
+                    raise Exception(f"Message tag {tag:#04x} already has a handler")
+                self.routes[tag] = route
+
             self.request_size = request_size
             self.request_delimiter = request_delimiter
 
@@ -51,64 +164,213 @@ class FastTCP:
 
         return decorator
 
-    def parser(self) -> Callable: ...
+    def on_connect(self, func: Callable[[Connection], None]):
+        self._add_hook(self.connect_hooks, func)
+        return func
+
+    def on_disconnect(self, func: Callable[[Connection], None]):
+        self._add_hook(self.disconnect_hooks, func)
+        return func
+
+    def _add_hook(self, hooks: list, func: Callable) -> None:
+        if inspect.iscoroutinefunction(func):
+            raise Exception("Connection hooks must be plain functions")
+        hooks.append(func)
+
+    def run(self, workers: int = 1):
+        if workers > 1:
+            if not self.state.shared:
+                raise ValueError(
+                    f"{type(self.state).__name__} is not shared between processes, "
+                    "use a shared state backend to run more than one worker"
+                )
+            self._print_addresses()
+            supervise(self._run_worker, workers)
+            return
 
-    def run(self):
         try:
             asyncio.run(self._start_server())
         except KeyboardInterrupt:
             print("bye.")
 
-    async def _start_server(self):
+    def _run_worker(self):
+        asyncio.run(self._serve(self._create_socket(reuse_port=True)))
+
+    async def create_server(
+        self, sock: socket.socket | None = None
+    ) -> asyncio.Server:
+        """Start accepting connections on sock, or on a new one bound to host:port."""
+        if sock is None:
+            sock = self._create_socket()
+
+        if self.mode == "protocol":
+            loop = asyncio.get_running_loop()
+            return await loop.create_server(lambda: FastTCPProtocol(self), sock=sock)
+        return await asyncio.start_server(self._handle_connection, sock=sock)
+
+    def _create_socket(self, reuse_port: bool = False) -> socket.socket:
         sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
         sock.setblocking(False)
         sock.bind((self.host, self.port))
         sock.listen()
+        return sock
 
+    async def _start_server(self):
+        sock = self._create_socket()
+        self._print_addresses()
+        await self._serve(sock)
+
+    async def _serve(self, sock: socket.socket):
+        server = await self.create_server(sock)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+    def _print_addresses(self):
         print(f"Listening on {self.port} at")
         for ip in get_ip():
             print(f"  => {ip}")
 
-        server = await asyncio.start_server(self._handle_connection, sock=sock)
-        async with server:
-            await server.serve_forever()
-
     async def _handle_connection(self, reader, writer):
         addr = writer.get_extra_info("peername")
         print(f"Connection from {addr}\n")
+        writer.transport.set_write_buffer_limits(high=self.write_high_water)
+        conn = self.connection(writer, addr)
+        for hook in self.connect_hooks:
+            hook(conn)
+        try:
+            await self._handle_requests(reader, writer, conn)
+        finally:
+            print(f"Closed connection from {addr}\n")
+            for hook in self.disconnect_hooks:
+                hook(conn)
+
+    async def _handle_requests(self, reader, writer, conn: Connection):
+        buffer = FrameBuffer()
+        out: list[bytes] = []
+        try:
+            while not conn.closing:
+                chunk = await reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer.feed(chunk)
 
-        async for request in self._parse_requests(reader):
-            response = await self.handler_func(request)
-            writer.write(response.to_bytes())
-            await writer.drain()
+                requests, error = self._decode(buffer)
+                batch_route, batch = None, []
+                for route, request in requests:
+                    if route.executor is not None:
+                        if batch_route is not route or len(batch) == self.offload_batch:
+                            if batch:
+                                out += await self._offload(batch_route, batch)
+                            batch_route, batch = route, []
+                        batch.append(request)
+                        continue
+                    if batch:
+                        out += await self._offload(batch_route, batch)
+                        batch_route, batch = None, []
 
-        print(f"Closed connection from {addr}\n")
+                    if route.takes_connection:
+                        response = route.func(request, conn)
+                    else:
+                        response = route.func(request)
+                    if route.is_async:
+                        response = await response
+                    if response is not None:
+                        out.append(response.to_bytes())
+                    if conn.closing:
+                        break
+                if batch:
+                    out += await self._offload(batch_route, batch)
+
+                if error is not None and not conn.closing:
+                    response = self._decode_error(error)
+                    if response is not None:
+                        out.append(response.to_bytes())
+                    break
+                if out:
+                    writer.writelines(out)
+                    out = []
+                    await writer.drain()  # only waits above write_high_water
+        except OSError:
+            raise  # the client is gone, nothing left to answer
+        except Exception as e:
+            # a handler raised, the answers to the requests before it are still sent
+            print(f"Error handling request: {e!r}")
+
+        writer.writelines(out)
         writer.close()
         await writer.wait_closed()
 
-    async def _parse_requests(self, reader: asyncio.StreamReader):
-        data = bytes()
-        while True:
-            chunk = await reader.read(CHUNK_SIZE)
-            if not chunk:
-                break
-            data += chunk
-
-            if self.request_size:
-                while len(data) >= self.request_size:
-                    request_bytes = data[: self.request_size]
-                    try:
-                        yield self.request_type.from_bytes(request_bytes)
-                    except ValueError as e:
-                        print(f"Error parsing request: {e!r}")
-                    data = data[self.request_size :]
-            elif self.request_delimiter:
-                # Delimiter-based protocol
-                while self.request_delimiter in data:
-                    request_bytes, data = data.split(self.request_delimiter, 1)
-                    try:
-                        yield self.request_type.from_bytes(request_bytes)
-                    except ValueError as e:
-                        print(f"Error parsing request: {e!r}")
+    async def _offload(self, route: Route, requests: list) -> list[bytes]:
+        """Run route.func over requests in the process pool, returns them encoded."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.process_workers)
+        loop = asyncio.get_running_loop()
+        responses = await loop.run_in_executor(
+            self.pool, run_batch, route.func, requests
+        )
+        return [response.to_bytes() for response in responses if response is not None]
+
+    def _decode(self, buffer: FrameBuffer) -> tuple[list, ValueError | None]:
+        """
+        Every complete request in the buffer, along with its route, and the error
+        that stopped decoding if any. Handlers run after, so an exception of their
+        own is never mistaken for a malformed request.
+        """
+        requests = []
+        try:
+            for item in self._requests(buffer):
+                requests.append(item)
+        except ValueError as e:  # UnknownTag too
+            return requests, e
+        return requests, None
+
+    def _decode_error(self, error: ValueError) -> Any:
+        """Report why decoding stopped, returns the response to close with."""
+        if isinstance(error, UnknownTag):
+            print(f"Unknown message tag: {error.tag:#04x}")
+            if self.on_unknown_tag is not None:
+                return self.on_unknown_tag(error.tag)
+            return None
+        # no way to find the start of the next message, give up on the client
+        print(f"Error parsing request: {error!r}")
+        return None
+
+    def _requests(self, buffer: FrameBuffer) -> Iterator[tuple[Route, Any]]:
+        """Decode every complete request in the buffer, along with its route."""
+        if self.routes is not None:
+            yield from buffer.tagged_messages(self.routes)
+            return
+
+        route = self.route
+        if not (self.request_size or self.request_delimiter):
+            for request in buffer.messages(route.decode_from):
+                yield route, request
+            return
+
+        if self.request_size:
+            frames = buffer.frames_sized(self.request_size)
+        else:
+            frames = buffer.frames_delimited(self.request_delimiter)
+
+        from_bytes = route.model.from_bytes
+        for request_bytes in frames:
+            try:
+                yield route, from_bytes(request_bytes)
+            except ValueError as e:
+                print(f"Error parsing request: {e!r}")
+
+
+def message_tag(model) -> int | None:
+    """The tag of a Struct model whose first field is a `message_type: u8` default."""
+    fields = getattr(model, "model_fields", ())
+    if not fields or model.__annotations__[fields[0]] is not u8:
+        return None
+    return model.model_defaults.get(fields[0])
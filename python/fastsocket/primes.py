@@ -0,0 +1,103 @@
+import random
+from functools import lru_cache
+
+SIEVE_LIMIT = 1 << 20
+MR_ROUNDS = 24  # rounds of probabilistic Miller-Rabin, above the deterministic range
+CACHE_SIZE = 4096
+
+"""
+Primality testing, in three tiers:
+
+n < SIEVE_LIMIT: one lookup in a sieve of odd numbers packed 8 per byte (64 KiB).
+n < 3.3e24: Miller-Rabin with the smallest set of bases known to be exact below
+    each bound, so the answer is deterministic.
+above: Miller-Rabin with MR_ROUNDS random bases, wrong with odds below 4**-rounds.
+
+Recent answers are kept in an LRU, clients tend to ask about the same numbers.
+"""
+
+# (bound, bases): Miller-Rabin with `bases` is exact for every n < bound
+# https://oeis.org/A014233
+MR_BASES = (
+    (2_047, (2,)),
+    (1_373_653, (2, 3)),
+    (25_326_001, (2, 3, 5)),
+    (3_215_031_751, (2, 3, 5, 7)),
+    (2_152_302_898_747, (2, 3, 5, 7, 11)),
+    (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+    (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+    (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (
+        3_317_044_064_679_887_385_961_981,
+        (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41),
+    ),
+)
+SMALL_PRIMES = (3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67)
+
+
+def build_sieve(limit: int) -> bytes:
+    """Bit i of byte i // 8 is set when 2 * i + 1 is prime."""
+    limit = (limit + 15) // 16 * 16
+    odd = bytearray([1]) * (limit // 2)  # odd[i] is 2 * i + 1
+    odd[0] = 0
+    for i in range(1, (int(limit**0.5) + 1) // 2):
+        if odd[i]:
+            p = 2 * i + 1
+            odd[p * p // 2 :: p] = bytes(len(range(p * p // 2, len(odd), p)))
+
+    # pack every 8 bytes into one, odd[j::8] are the bits at position j
+    packed = 0
+    for j in range(8):
+        packed |= int.from_bytes(odd[j::8], "little") << j
+    return packed.to_bytes(len(odd) // 8, "little")
+
+
+SIEVE = build_sieve(SIEVE_LIMIT)
+
+
+def miller_rabin(n: int, bases) -> bool:
+    """n is odd and > 2, and not divisible by any of SMALL_PRIMES."""
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class PrimalityTester:
+    def __init__(self, rounds: int = MR_ROUNDS, cache_size: int = CACHE_SIZE):
+        self.rounds = rounds
+        self.is_prime = lru_cache(maxsize=cache_size)(self._is_prime)
+
+    def _is_prime(self, n: int) -> bool:
+        if n < SIEVE_LIMIT:
+            if n < 3:
+                return n == 2
+            return n & 1 == 1 and SIEVE[n >> 4] >> ((n >> 1) & 7) & 1 == 1
+
+        if n & 1 == 0:
+            return False
+        for p in SMALL_PRIMES:
+            if n % p == 0:
+                return False
+
+        for bound, bases in MR_BASES:
+            if n < bound:
+                return miller_rabin(n, bases)
+
+        rng = random.Random(n)  # the same number always gets the same answer
+        bases = [rng.randrange(2, n - 1) for _ in range(self.rounds)]
+        return miller_rabin(n, bases)
+
+
+is_prime = PrimalityTester().is_prime
@@ -0,0 +1,172 @@
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING
+
+from .connection import Connection
+from .framing import FrameBuffer
+
+if TYPE_CHECKING:
+    from .main import FastTCP
+
+"""
+Low level transport for FastTCP, used with FastTCP(mode="protocol").
+
+Bytes are framed straight in data_received and synchronous handlers are called
+inline, so a request costs no task, no async generator step and no drain.
+Async and process pool handlers are queued and run one after the other by a
+single task per connection, which keeps the responses in request order.
+
+Responses are gathered in `out` and sent with one writelines at the end of
+data_received (or once the queue task yields to the loop), the transport pauses reading
+from the client while more than app.write_high_water bytes are buffered.
+
+A protocol lives as long as its connection, so it uses __slots__ and creates
+the queue only once a request has to wait in it. The client's Connection (see
+connection.py) gets the transport as its writer.
+"""
+
+
+class FastTCPProtocol(asyncio.Protocol):
+    __slots__ = ("app", "buffer", "pending", "task", "transport", "out", "conn")
+
+    def __init__(self, app: "FastTCP"):
+        self.app = app
+        self.buffer = FrameBuffer()
+        self.pending: deque | None = None  # requests waiting for an async handler
+        self.task: asyncio.Task | None = None
+        self.transport: asyncio.Transport | None = None
+        self.out: list[bytes] = []
+        self.conn: Connection | None = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.app.write_high_water)
+        addr = transport.get_extra_info("peername")
+        print(f"Connection from {addr}\n")
+        self.conn = self.app.connection(transport, addr)
+        for hook in self.app.connect_hooks:
+            hook(self.conn)
+
+    def data_received(self, data: bytes) -> None:
+        app, conn = self.app, self.conn
+        if conn.closing:
+            return  # the last chunks before the transport closes
+        self.buffer.feed(data)
+
+        requests, error = app._decode(self.buffer)
+        for route, request in requests:
+            # wait behind the runner, even when it has taken the last request
+            if route.is_async or route.executor or self.task or self.pending:
+                self.queue(route, request)
+            elif route.takes_connection:
+                self.write(route.func(request, conn))
+            else:
+                self.write(route.func(request))
+            if conn.closing:
+                break
+        if error is not None and not conn.closing:
+            self.abort(app._decode_error(error))
+
+        if self.pending:
+            if self.task is None:
+                self.task = asyncio.get_running_loop().create_task(self.run_pending())
+        elif conn.closing:
+            self.abort(None)
+        else:
+            self.flush()
+
+    async def run_pending(self) -> None:
+        try:
+            while self.pending:
+                route, request = self.pending.popleft()
+                if route is None:  # queued by abort()
+                    self.write(request)
+                    self.flush()
+                    self.transport.close()
+                    break
+                if route.executor is not None:
+                    batch = [request]
+                    while (
+                        self.pending
+                        and self.pending[0][0] is route
+                        and len(batch) < self.app.offload_batch
+                    ):
+                        batch.append(self.pending.popleft()[1])
+                    self.flush()
+                    # self.out may be flushed and replaced while the pool works
+                    for data in await self.app._offload(route, batch):
+                        self.write_bytes(data)
+                    continue
+                if route.takes_connection:
+                    response = route.func(request, self.conn)
+                else:
+                    response = route.func(request)
+                if route.is_async:
+                    response = await response
+                self.write(response)
+                if self.conn.closing:
+                    self.pending.clear()
+                    self.abort(None)
+                    break
+            self.flush()
+        except Exception as e:
+            # as asyncio does when an inline handler raises in data_received, but
+            # the answers to the requests before it are still sent
+            print(f"Error handling request: {e!r}")
+            self.conn.closing = True
+            self.pending.clear()
+            self.flush()
+            self.transport.close()
+        finally:
+            self.task = None
+
+    def queue(self, route, request) -> None:
+        if self.pending is None:
+            self.pending = deque()
+        self.pending.append((route, request))
+
+    def abort(self, response) -> None:
+        """Send `response` after the requests already received, then disconnect."""
+        self.transport.pause_reading()
+        if self.pending:
+            self.queue(None, response)
+        else:
+            self.write(response)
+            self.flush()
+            self.transport.close()
+
+    def write(self, response) -> None:
+        if response is not None:
+            self.write_bytes(response.to_bytes())
+
+    def write_bytes(self, data: bytes) -> None:
+        if not self.out and self.task is not None:
+            # flushes as soon as a handler actually has to wait for something
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.out.append(data)
+
+    def flush(self) -> None:
+        if self.out:
+            self.transport.writelines(self.out)
+            self.out = []
+
+    def pause_writing(self) -> None:
+        # the client is not keeping up with the responses, stop reading requests
+        self.transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        self.transport.resume_reading()
+
+    def eof_received(self) -> bool:
+        # keep the transport open until the queued requests are answered
+        if self.task is not None:
+            self.task.add_done_callback(lambda _: self.transport.close())
+            return True
+        return False
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        print(f"Closed connection from {self.conn.peername}\n")
+        for hook in self.app.disconnect_hooks:
+            hook(self.conn)
@@ -0,0 +1,59 @@
+import re
+from typing import Callable
+
+"""
+Line rewriting for proxies, on bytes, as used by Mob in the Middle.
+
+    rewrite = Rewriter([Rule(BOGUSCOIN_RE, lambda m: m[1] + TONY, guard=b"7")])
+    rewrite(b"send it to 7iKDZEwPZSqIvDnHvVN2r0hUWXD5rHX")  # the address is Tony's
+
+A Rule is a precompiled bytes regex and its replacement, a template or a
+function of the match, plus an optional guard: bytes the line must contain for
+the pattern to possibly match. Checking a line is cheapest first:
+  1. the guard is a plain `in`, a memchr, lines without it never reach re.
+  2. a search(), re.sub() parses its template on every call even when nothing
+     matches, a search() doesn't.
+  3. only lines that really match are rewritten with sub().
+Nothing is decoded or encoded. A function replacement is faster than a template
+with group references, those are expanded anew for every match.
+
+Rules apply in order, each to the output of the one before.
+"""
+
+Replacement = bytes | Callable[[re.Match[bytes]], bytes]
+
+
+class Rule:
+    __slots__ = ("pattern", "replacement", "guard", "search", "sub")
+
+    def __init__(
+        self,
+        pattern: bytes | re.Pattern[bytes],
+        replacement: Replacement,
+        guard: bytes = b"",
+    ):
+        self.pattern = re.compile(pattern) if isinstance(pattern, bytes) else pattern
+        self.replacement = replacement
+        self.guard = guard
+        self.search = self.pattern.search
+        self.sub = self.pattern.sub
+
+    def __call__(self, line: bytes) -> bytes:
+        if self.guard in line and self.search(line) is not None:
+            return self.sub(self.replacement, line)
+        return line
+
+
+class Rewriter:
+    def __init__(self, rules: list[Rule] | None = None):
+        self.rules = list(rules or [])
+
+    def add(self, rule: Rule) -> None:
+        self.rules.append(rule)
+
+    def __call__(self, line: bytes) -> bytes:
+        # Rule.__call__ inlined, this runs for every line through the proxy
+        for rule in self.rules:
+            if rule.guard in line and rule.search(line) is not None:
+                line = rule.sub(rule.replacement, line)
+        return line
@@ -0,0 +1,168 @@
+from bisect import bisect_left
+from collections import deque
+from typing import NamedTuple, Protocol
+
+DAY = 86400  # seconds
+MILE_BITS = 16  # a sighting is packed as timestamp << MILE_BITS | mile
+MILE_MASK = (1 << MILE_BITS) - 1
+BACKLOG_SIZE = 4096  # tickets held per road while it has no dispatcher
+
+"""
+Speed checks for the Speed Daemon, from plate observations.
+
+    tracker = SpeedTracker()
+    for violation in tracker.observe("UN1X", road=123, mile=8, timestamp=0, limit=60):
+        ...  # Ticket(**violation._asdict())
+
+Every (road, plate) pair keeps its sightings as one sorted list of ints, the
+timestamp and mile packed into one, so a sighting is a bisect and a list insert
+away, in whatever order the cameras report them. A car's average speed only
+needs checking between a new sighting and its neighbours on that road, the
+pairs further apart are covered by the ones in between.
+
+A car gets at most one ticket per day, a ticket spanning several days counts
+for all of them. The days ticketed are a bitset per plate, split into 64 day
+words kept under (plate, day >> 6), so checking a day is one dict lookup and a
+shift whatever the timestamps are.
+
+A speed of limit + 0.5 mph or more is a violation, compared in integers.
+
+A TicketRouter hands encoded tickets to the dispatchers of their road:
+
+    router = TicketRouter()
+    router.register(writer, roads=[123, 456])  # writes what was held for them
+    router.route(123, Ticket(**violation._asdict()).encode())
+    router.unregister(writer)
+
+Each road has its own list of dispatchers, taken in turns, so routing is one
+dict lookup however many clients are connected. A road nobody dispatches for
+holds its tickets in a backlog of BACKLOG_SIZE, the oldest are dropped past
+that. A dispatcher registering for such roads gets all of their backlogs in a
+single write.
+"""
+
+
+class Violation(NamedTuple):
+    plate: str
+    road: int
+    mile1: int
+    timestamp1: int
+    mile2: int
+    timestamp2: int
+    speed: int  # 100x miles per hour
+
+
+class SpeedTracker:
+    def __init__(self):
+        self.sightings: dict[tuple[int, str], list[int]] = {}
+        self.ticketed: dict[tuple[str, int], int] = {}  # 64 days per word
+
+    def __len__(self) -> int:
+        return sum(map(len, self.sightings.values()))
+
+    def observe(
+        self, plate: str, road: int, mile: int, timestamp: int, limit: int
+    ) -> list[Violation]:
+        """Record a sighting, returns the tickets it makes due."""
+        sighting = timestamp << MILE_BITS | mile
+        seen = self.sightings.get((road, plate))
+        if seen is None:
+            self.sightings[road, plate] = [sighting]
+            return []
+
+        i = bisect_left(seen, sighting)
+        if i < len(seen) and seen[i] == sighting:
+            return []  # reported twice
+        seen.insert(i, sighting)
+
+        violations = []
+        if i > 0:
+            violation = self._check(plate, road, limit, seen[i - 1], sighting)
+            if violation is not None:
+                violations.append(violation)
+        if i + 1 < len(seen):
+            violation = self._check(plate, road, limit, sighting, seen[i + 1])
+            if violation is not None:
+                violations.append(violation)
+        return violations
+
+    def _check(
+        self, plate: str, road: int, limit: int, earlier: int, later: int
+    ) -> Violation | None:
+        timestamp1, mile1 = earlier >> MILE_BITS, earlier & MILE_MASK
+        timestamp2, mile2 = later >> MILE_BITS, later & MILE_MASK
+        elapsed = timestamp2 - timestamp1
+        distance = abs(mile2 - mile1)
+        # distance / (elapsed / 3600) >= limit + 0.5
+        if elapsed == 0 or distance * 7200 < (2 * limit + 1) * elapsed:
+            return None
+        if not self._claim(plate, timestamp1 // DAY, timestamp2 // DAY):
+            return None
+        # a u16 on the wire, a faster car is ticketed at the most it can say
+        speed = min(round(distance * 360000 / elapsed), 0xFFFF)
+        return Violation(plate, road, mile1, timestamp1, mile2, timestamp2, speed)
+
+    def _claim(self, plate: str, first: int, last: int) -> bool:
+        """Mark days first..last ticketed, unless one of them already was."""
+        ticketed = self.ticketed
+        for day in range(first, last + 1):
+            if ticketed.get((plate, day >> 6), 0) >> (day & 63) & 1:
+                return False
+        for day in range(first, last + 1):
+            key = (plate, day >> 6)
+            ticketed[key] = ticketed.get(key, 0) | 1 << (day & 63)
+        return True
+
+
+class Writer(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+
+class TicketRouter:
+    def __init__(self, backlog_size: int = BACKLOG_SIZE):
+        self.backlog_size = backlog_size
+        self.dispatchers: dict[int, list[Writer]] = {}
+        self.turn: dict[int, int] = {}  # road -> index of the next dispatcher
+        self.roads: dict[Writer, list[int]] = {}
+        self.backlogs: dict[int, deque[bytes]] = {}
+        self.dropped = 0  # tickets pushed out of a full backlog
+
+    def register(self, writer: Writer, roads: list[int]) -> None:
+        self.roads[writer] = roads
+        held = []
+        for road in roads:
+            dispatchers = self.dispatchers.get(road)
+            if dispatchers is None:
+                self.dispatchers[road] = [writer]
+                self.turn[road] = 0
+            else:
+                dispatchers.append(writer)
+            backlog = self.backlogs.pop(road, None)
+            if backlog:
+                held.extend(backlog)
+        if held:
+            writer.write(b"".join(held))
+
+    def unregister(self, writer: Writer) -> None:
+        for road in self.roads.pop(writer, ()):
+            dispatchers = self.dispatchers[road]
+            dispatchers.remove(writer)
+            if not dispatchers:
+                del self.dispatchers[road], self.turn[road]
+
+    def route(self, road: int, ticket: bytes) -> None:
+        dispatchers = self.dispatchers.get(road)
+        if dispatchers is None:
+            backlog = self.backlogs.get(road)
+            if backlog is None:
+                backlog = self.backlogs[road] = deque(maxlen=self.backlog_size)
+            elif len(backlog) == self.backlog_size:
+                self.dropped += 1
+            backlog.append(ticket)
+            return
+
+        turn = self.turn[road]
+        if turn >= len(dispatchers):
+            turn = 0
+        dispatchers[turn].write(ticket)
+        self.turn[road] = turn + 1
@@ -0,0 +1,98 @@
+import os
+from abc import ABC, abstractmethod
+from multiprocessing.managers import BaseManager, DictProxy
+from typing import Any, ClassVar
+
+"""
+State that handlers share between connections goes through a StateBackend.
+
+With FastTCP.run(workers=N) every worker is its own process, so a plain dict
+would silently diverge between them. FastTCP refuses to start more than one
+worker unless its backend is shared.
+
+LocalBackend: a dict in this process, the default.
+ManagerBackend: a dict living in a multiprocessing manager process, every call
+    is a round trip over a local socket, so keep it off the per-frame path.
+"""
+
+
+class StateBackend(ABC):
+    shared: ClassVar[bool] = False
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None: ...
+
+    @abstractmethod
+    def setdefault(self, key: str, default: Any) -> Any: ...
+
+    @abstractmethod
+    def pop(self, key: str, default: Any = None) -> Any: ...
+
+
+class LocalBackend(StateBackend):
+    shared = False
+
+    def __init__(self):
+        self.data: dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.data[key] = value
+
+    def setdefault(self, key: str, default: Any) -> Any:
+        return self.data.setdefault(key, default)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        return self.data.pop(key, default)
+
+
+_shared_state: dict[str, Any] = {}
+
+
+def _get_shared_state() -> dict[str, Any]:
+    return _shared_state
+
+
+class _StateManager(BaseManager):
+    pass
+
+
+_StateManager.register("state", callable=_get_shared_state, proxytype=DictProxy)
+
+
+class ManagerBackend(StateBackend):
+    shared = True
+
+    def __init__(self):
+        manager = _StateManager()
+        manager.start()
+        self.manager = manager
+        self.address = manager.address
+        self.pid = os.getpid()
+        self.data = manager.state()
+
+    def _proxy(self) -> DictProxy:
+        # forked workers can't share the parent's connection, open their own
+        if self.pid != os.getpid():
+            manager = _StateManager(address=self.address)
+            manager.connect()
+            self.pid = os.getpid()
+            self.data = manager.state()
+        return self.data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._proxy().get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self._proxy()[key] = value
+
+    def setdefault(self, key: str, default: Any) -> Any:
+        return self._proxy().setdefault(key, default)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        return self._proxy().pop(key, default)
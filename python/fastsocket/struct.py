@@ -1,16 +1,224 @@
-import re
 import struct
-from typing import Any, ClassVar, Self, Type, TypedDict, TypeVar, get_args, get_origin
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Self,
+    Type,
+    TypedDict,
+    TypeVar,
+    get_args,
+    get_origin,
+)
 
 T = TypeVar("T", bound="Struct")
 
 """
 Issues:
-    1. cannot decode because we don't known the length of dynamic types, to create the struct. in short, struct won't work, need manual byte decoding.
-    2. list of strings doesn't work.
+    1. list of strings doesn't work.
 """
 
 
+class NeedMore:
+    """
+    Returned by Struct.decode_from when the buffer ends in the middle of a message.
+    `size` is how many more bytes are needed at least, the message can still turn
+    out longer once a length prefix is known.
+    """
+
+    __slots__ = ("size",)
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"NeedMore({self.size})"
+
+
+def field_format(field_name: str, field_type: Any) -> str:
+    """
+    Format of a field, for str and list[...] the format of one element, following
+    a u8 length prefix.
+    """
+    if field_type in FMT_MAP:
+        return FMT_MAP[field_type]
+
+    if field_type is str:
+        return "s"
+
+    if get_origin(field_type) is list:
+        elem_type = get_args(field_type)[0]
+        if elem_type not in FMT_MAP:
+            raise TypeError(f"Unsupported type: {field_type}")
+        return FMT_MAP[elem_type]
+
+    raise TypeError(f"Unsupported type: {field_name} {field_type}")
+
+
+def make_codec(name: str, fields: list[str], types: list[Any]):
+    """
+    Generate the encode, decode and decode_from functions of a Struct class.
+
+    Fixed width fields are collapsed into runs, each packed by one cached
+    struct.Struct. A str or list[...] field ends the run before it with its u8
+    length prefix, and its items are handled inline by the generated code.
+
+        class Ticket(Struct):               def encode(self):
+            message_type: u8 = u8(0x21)         v1 = self.plate.encode()
+            plate: str                          return (
+            road: u16                               s0.pack(self.message_type, len(v1))
+            ...                                     + v1
+                                                    + s1.pack(self.road, ...)
+                                                )
+
+    decode and decode_from share the same body, they only differ in what they do
+    when the buffer is too short, raise or return NeedMore.
+    """
+    env: dict[str, Any] = {
+        "struct": struct,
+        "NeedMore": NeedMore,
+        "_str": str,
+        "_list": list,
+    }
+    runs: list[struct.Struct] = []
+    enc_pre = []  # statements before the return in encode
+    enc_parts = []  # expressions concatenated into the encoded bytes
+    dec: list[str | tuple] = []  # statements of decode, and ("short", bytes needed)
+    run_fmt, run_enc, run_dec = "", [], []
+
+    def flush_run():
+        nonlocal run_fmt, run_enc, run_dec
+        if not run_fmt:
+            return
+        s = f"s{len(runs)}"
+        env[s] = run = struct.Struct("!" + run_fmt)
+        runs.append(run)
+        enc_parts.append(f"{s}.pack({', '.join(run_enc)})")
+        dec.append(f"if end - off < {run.size}:")
+        dec.append(("short", f"off + {run.size} - end"))
+        dec.append(f"{', '.join(run_dec)}, = {s}.unpack_from(data, off)")
+        dec.append(f"off += {run.size}")
+        run_fmt, run_enc, run_dec = "", [], []
+
+    for i, (field, field_type) in enumerate(zip(fields, types)):
+        fmt = field_format(field, field_type)
+        if field_type is str:
+            enc_pre.append(f"v{i} = self.{field}.encode()")
+            run_fmt += "B"
+            run_enc.append(f"len(v{i})")
+            run_dec.append(f"n{i}")
+            flush_run()
+            enc_parts.append(f"v{i}")
+            dec.append(f"if end - off < n{i}:")
+            dec.append(("short", f"off + n{i} - end"))
+            dec.append(f"v{i} = _str(data[off : off + n{i}], 'utf-8')")
+            dec.append(f"off += n{i}")
+        elif get_origin(field_type) is list:
+            size = struct.calcsize(fmt)
+            enc_pre.append(f"v{i} = self.{field}")
+            run_fmt += "B"
+            run_enc.append(f"len(v{i})")
+            run_dec.append(f"n{i}")
+            flush_run()
+            enc_parts.append(f"struct.pack('!%d{fmt}' % len(v{i}), *v{i})")
+            dec.append(f"if end - off < n{i} * {size}:")
+            dec.append(("short", f"off + n{i} * {size} - end"))
+            dec.append(f"v{i} = struct.unpack_from('!%d{fmt}' % n{i}, data, off)")
+            dec.append(f"v{i} = _list(v{i})")
+            dec.append(f"off += n{i} * {size}")
+        else:
+            run_fmt += fmt
+            run_enc.append(f"self.{field}")
+            run_dec.append(f"v{i}")
+    flush_run()
+
+    encoded = " + ".join(enc_parts) or "b''"
+    assign = [f"self.{field} = v{i}" for i, field in enumerate(fields)]
+
+    def body(short: str) -> list[str]:
+        lines = []
+        for line in dec:
+            if isinstance(line, tuple):
+                lines.append(f"        {short.format(need=line[1])}")
+            else:
+                lines.append(f"    {line}")
+        return lines
+
+    src = "\n".join(
+        [
+            "def encode(self):",
+            *(f"    {line}" for line in enc_pre),
+            f"    return {encoded}",
+            "",
+            "def decode(cls, data):",
+            "    off, end = 0, len(data)",
+            *body(f"raise ValueError(f'Invalid {name} size: {{{{end}}}}')"),
+            "    if off != end:",
+            f"        raise ValueError(f'Invalid {name} size: {{end}}')",
+            "    self = object.__new__(cls)",
+            *(f"    {line}" for line in assign),
+            "    return self",
+            "",
+            "def decode_from(cls, data, offset=0):",
+            "    off, end = offset, len(data)",
+            *body("return NeedMore({need})"),
+            "    self = object.__new__(cls)",
+            *(f"    {line}" for line in assign),
+            "    return self, off - offset",
+        ]
+    )
+    exec(compile(src, f"<{name} codec>", "exec"), env)
+    for func in ("encode", "decode", "decode_from"):
+        env[func].__qualname__ = f"{name}.{func}"
+    return env["encode"], env["decode"], env["decode_from"]
+
+
+def make_methods(name: str, fields: list[str], defaults: dict[str, Any]):
+    """
+    Generate the __init__, __eq__ and __repr__ of a Struct class.
+
+    Fields without a default can be given by position, in order, the ones with a
+    default only by keyword. The defaults are kept once, on the class.
+
+        class Ticket(Struct):               def __init__(self, plate, road, ...,
+            message_type: u8 = u8(0x21)                  *, message_type=d0):
+            plate: str                          self.message_type = message_type
+            ...                                 self.plate = plate
+                                                ...
+    """
+    env: dict[str, Any] = {}
+    params = [field for field in fields if field not in defaults]
+    keywords = []
+    for i, field in enumerate(fields):
+        if field in defaults:
+            env[f"d{i}"] = defaults[field]
+            keywords.append(f"{field}=d{i}")
+    if keywords:
+        params += ["*", *keywords]
+
+    own = ", ".join(f"self.{field}" for field in fields)
+    theirs = ", ".join(f"other.{field}" for field in fields)
+    shown = ", ".join(f"{field}={{self.{field}!r}}" for field in fields)
+    src = "\n".join(
+        [
+            f"def __init__({', '.join(['self', *params])}):",
+            *([f"    self.{field} = {field}" for field in fields] or ["    pass"]),
+            "",
+            "def __eq__(self, other):",
+            "    if other.__class__ is not self.__class__:",
+            "        return NotImplemented",
+            f"    return ({own},) == ({theirs},)" if fields else "    return True",
+            "",
+            "def __repr__(self):",
+            f"    return f'{name}({shown})'",
+        ]
+    )
+    exec(compile(src, f"<{name} methods>", "exec"), env)
+    for func in ("__init__", "__eq__", "__repr__"):
+        env[func].__qualname__ = f"{name}.{func}"
+    return env["__init__"], env["__eq__"], env["__repr__"]
+
+
 class StructMeta(type):
     def __new__(mcs, name, bases, namespace):
         # load config class
@@ -25,77 +233,33 @@ class StructMeta(type):
         # namespace["config"] = cast(StructConfig, config)
 
         annotations = namespace.get("__annotations__", {})
-        model_defaults = {
-            k: v
-            for k, v in namespace.items()
-            if not callable(v) and not k.startswith("__")
-        }
 
         model_fields = []
+        model_types = []
         for field_name, field_type in annotations.items():
             if hasattr(field_type, "__origin__") and field_type.__origin__ is ClassVar:
                 continue
 
             model_fields.append(field_name)
+            model_types.append(field_type)
+        # the defaults move to model_defaults, they'd clash with the slots
+        model_defaults = {k: namespace.pop(k) for k in model_fields if k in namespace}
 
-        def make_new(model_fields, model_defaults):
-            def __new__(cls, **data):
-                self = object.__new__(cls)
-                for field in model_fields:
-                    if field in data:
-                        setattr(self, field, data[field])
-                    elif field not in model_defaults:
-                        raise TypeError(f"Missing required argument: {field}")
-                return self
-
-            return __new__
-
-        def struct_fmt(field_name, field_type, field_value) -> str:
-            # Full struct-compatible type map
-            FMT_MAP = {
-                i8: "b",  # signed char
-                u8: "B",  # unsigned char
-                i16: "h",  # signed short
-                u16: "H",  # unsigned short
-                i32: "i",  # signed int
-                u32: "I",  # unsigned int
-                i64: "q",  # signed long long
-                u64: "Q",  # unsigned long long
-                f32: "f",  # float
-                f64: "d",  # double
-                bool: "?",
-                byte: "B",
-                rune: "i",
-            }
-
-            if field_type in FMT_MAP:
-                return FMT_MAP[field_type]
-
-            if field_type is str:
-                return f"{FMT_MAP[u8]}{len(field_value)}s"
-
-            if get_origin(field_type) is list:
-                elem_type = get_args(field_type)[0]
-                if elem_type not in FMT_MAP:
-                    raise TypeError(f"Unsupported type: {field_type}")
-                return f"{FMT_MAP[u8]}{len(field_value)}{FMT_MAP[elem_type]}"
-
-            raise TypeError(f"Unsupported type: {field_name} {field_type}")
-
-        @property
-        def model_struct(self: "Struct") -> struct.Struct:
-            fmt = "!"
-            for field_name, field_type in self.__annotations__.items():
-                field_value = getattr(self, field_name)
-                fmt += struct_fmt(field_name, field_type, field_value)
-            return struct.Struct(fmt)
+        init, eq, repr_ = make_methods(name, model_fields, model_defaults)
+        encode, decode, decode_from = make_codec(name, model_fields, model_types)
 
         namespace["model_fields"] = tuple(model_fields)
-        namespace["model_struct"] = model_struct
-        namespace["__new__"] = make_new(model_fields, model_defaults)
-        # namespace["__slots__"] = tuple(
-        #     f for f in model_fields if f not in model_defaults
-        # )
+        namespace["model_defaults"] = model_defaults
+        namespace["__slots__"] = tuple(model_fields)
+        namespace["__init__"] = init
+        namespace.setdefault("__eq__", eq)
+        namespace.setdefault("__repr__", repr_)
+        namespace["encode"] = encode
+        namespace["decode"] = classmethod(decode)
+        namespace["decode_from"] = classmethod(decode_from)
+        # so a Struct can be used as a FastTCP model as is
+        namespace.setdefault("to_bytes", encode)
+        namespace.setdefault("from_bytes", classmethod(decode))
 
         return super().__new__(mcs, name, bases, namespace)
 
@@ -104,43 +268,31 @@ class Struct(metaclass=StructMeta):
     model_fields: ClassVar[tuple[str, ...]]
     model_defaults: ClassVar[dict[str, Any]]
 
-    def __new__(cls: type[Self], **data: Any) -> Self: ...
-    @property
-    def model_struct(self: Self) -> struct.Struct: ...
-
-    def encode(self: "Struct") -> bytes:
-        values = []
-        for field in self.model_fields:
-            val = getattr(self, field)
-            if isinstance(val, str):
-                values.append(len(val))
-                values.append(val.encode())
-            elif isinstance(val, list):
-                values.append(len(val))
-                values.extend(val)
-            else:
-                values.append(val)
-        return self.model_struct.pack(*values)
-
+    def __init__(self, *args: Any, **data: Any) -> None: ...
+    def encode(self: Self) -> bytes: ...
     @classmethod
-    def decode(cls: Type[T], data: bytes) -> T:
-        s = cls().model_struct
-        unpacked = s.unpack(data)
-
-        values: dict[str, Any] = {}
-        idx = 0
-        for field in cls.model_fields:
-            default = cls.model_defaults.get(field)
-            if isinstance(default, str):
-                # expect length + bytes
-                _len = unpacked[idx]
-                values[field] = unpacked[idx + 1][:_len].decode()
-                idx += 2
-            else:
-                values[field] = unpacked[idx]
-                idx += 1
+    def decode(cls: Type[T], data: bytes) -> T: ...
+    @classmethod
+    def decode_from(
+        cls: Type[T], data: bytes | memoryview, offset: int = 0
+    ) -> tuple[T, int] | NeedMore:
+        """
+        Decode one message starting at data[offset:], without copying the buffer.
+        Returns the message and the number of bytes it took, or NeedMore.
+        """
+
+    def __reduce__(self) -> tuple[Callable, tuple]:
+        # pickle (and the FastTCP process pool) gets the field values in order
+        values = tuple(getattr(self, field) for field in self.model_fields)
+        return restore, (self.__class__, values)
+
 
-        return cls(**values)
+def restore(cls: type[T], values: tuple) -> T:
+    """Rebuild a pickled Struct, without going through __init__."""
+    self = object.__new__(cls)
+    for field, value in zip(cls.model_fields, values):
+        setattr(self, field, value)
+    return self
 
 
 class StructConfig(TypedDict, total=False):
@@ -207,16 +359,41 @@ class rune(i32, StructValue):
     pass
 
 
-def print_hex(obj: Struct) -> None:
-    def group_fmt(fmt: str) -> list[str]:
-        return re.findall(r"\d*[xcbB?hHiIlLqQnNefdspP]", fmt)
+# Full struct-compatible type map
+FMT_MAP = {
+    i8: "b",  # signed char
+    u8: "B",  # unsigned char
+    i16: "h",  # signed short
+    u16: "H",  # unsigned short
+    i32: "i",  # signed int
+    u32: "I",  # unsigned int
+    i64: "q",  # signed long long
+    u64: "Q",  # unsigned long long
+    f32: "f",  # float
+    f64: "d",  # double
+    bool: "?",
+    byte: "B",
+    rune: "i",
+}
+
 
+def print_hex(obj: Struct) -> None:
     encoded = obj.encode()
-    fmt = obj.model_struct.format[1:]
+    fmts = []
+    for field in obj.model_fields:
+        field_type = obj.__annotations__[field]
+        fmt = field_format(field, field_type)
+        value = getattr(obj, field)
+        if field_type is str:
+            fmt = f"B{len(value.encode())}{fmt}"
+        elif get_origin(field_type) is list:
+            fmt = f"B{len(value)}{fmt}"
+        fmts.append(fmt)
+
     offset = 0
-    print(f"{obj.__class__.__name__} ({fmt}):")
-    for field, fmt_char in zip(obj.model_fields, group_fmt(fmt)):
-        size = struct.calcsize(fmt_char)
+    print(f"{obj.__class__.__name__} ({''.join(fmts)}):")
+    for field, fmt in zip(obj.model_fields, fmts):
+        size = struct.calcsize(f"!{fmt}")
         field_bytes = encoded[offset : offset + size]
         print(f"  {field}: {' '.join(f'{b:02X}' for b in field_bytes)}")
         offset += size
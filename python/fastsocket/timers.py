@@ -0,0 +1,143 @@
+import asyncio
+from typing import Protocol
+
+TICK = 0.1  # seconds, Speed Daemon's heartbeat intervals are in deciseconds
+LEVEL_BITS = (8, 6, 6, 6, 6)  # slots per level: 256, then 64, together 32 bits
+
+"""
+A hierarchical timer wheel for periodic writes, like Speed Daemon heartbeats.
+
+    wheel = TimerWheel()
+    timer = wheel.every(25, writer, Heartbeat().encode())  # every 2.5s
+    ...
+    timer.cancel()  # on disconnect
+
+One loop callback per tick drives every timer, instead of a sleeping task and a
+TimerHandle per client. The first level has a slot per tick for the next 256
+ticks, each level after it has 64 slots, each as long as the whole level below.
+A timer goes into the slot of its next deadline at the lowest level that
+reaches that far. Whenever a level comes round, the next slot of the level
+above is emptied into it, each timer moving down to a finer slot.
+
+A tick pops one slot: every timer in it writes its bytes, and is put back in
+the wheel one interval later. Slots are sets, so cancelling is one discard.
+
+Ticks are counted from the loop clock, a late tick catches up on all of the
+ticks it missed at once. The wheel stops ticking while it holds no timers.
+"""
+
+
+class Writer(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+
+class Timer:
+    __slots__ = ("writer", "data", "interval", "deadline", "slot")
+
+    def __init__(self, writer: Writer, data: bytes, interval: int, deadline: int):
+        self.writer = writer
+        self.data = data
+        self.interval = interval  # ticks
+        self.deadline = deadline  # tick
+        self.slot: set[Timer] | None = None
+
+    def cancel(self) -> None:
+        if self.slot is not None:
+            self.slot.discard(self)
+            self.slot = None
+
+
+class TimerWheel:
+    def __init__(self, tick: float = TICK):
+        self.tick = tick
+        self.levels: list[list[set[Timer]]] = [
+            [set() for _ in range(1 << bits)] for bits in LEVEL_BITS
+        ]
+        self.now = 0  # ticks run so far
+        self.start = 0.0  # loop time of tick 0
+        self.handle: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return sum(len(slot) for level in self.levels for slot in level)
+
+    def every(self, interval: int, writer: Writer, data: bytes) -> Timer:
+        """Write data to writer every `interval` ticks, until cancelled."""
+        if interval < 1:
+            raise ValueError("interval must be at least one tick")
+        if self.handle is None:
+            self._resume()
+        timer = Timer(writer, data, interval, self.now + interval)
+        self._add(timer)
+        return timer
+
+    def _add(self, timer: Timer) -> None:
+        deadline = timer.deadline
+        ahead = deadline - self.now
+        if ahead < 0x100:  # most heartbeats are seconds apart, skip the search
+            slot = self.levels[0][deadline & 0xFF]
+            slot.add(timer)
+            timer.slot = slot
+            return
+
+        shift = 0
+        for level, bits in zip(self.levels, LEVEL_BITS):
+            if ahead < 1 << (shift + bits) or level is self.levels[-1]:
+                slot = level[(deadline >> shift) & ((1 << bits) - 1)]
+                break
+            shift += bits
+        slot.add(timer)
+        timer.slot = slot
+
+    def _resume(self) -> None:
+        # after an idle spell, count ticks from now on
+        loop = asyncio.get_running_loop()
+        self.start = loop.time() - self.now * self.tick
+        self.handle = loop.call_at(self.start + (self.now + 1) * self.tick, self._run)
+
+    def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # call_at() may run us a hair early, we are here for the next tick anyway
+        due = max(self.now + 1, int((loop.time() - self.start) / self.tick))
+        first = self.levels[0]
+        while self.now < due:
+            self.now += 1
+            now = self.now
+            index = now & 0xFF
+            if index == 0:
+                self._cascade(now)
+
+            slot = first[index]
+            if not slot:
+                continue
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                if timer.slot is not slot:
+                    continue  # cancelled by a write before it
+                timer.writer.write(timer.data)
+                timer.deadline += timer.interval
+                if timer.interval < 0x100:
+                    timer.slot = first[timer.deadline & 0xFF]
+                    timer.slot.add(timer)
+                else:
+                    self._add(timer)
+
+        if any(map(any, self.levels)):
+            next_tick = self.start + (self.now + 1) * self.tick
+            self.handle = loop.call_at(next_tick, self._run)
+        else:
+            self.handle = None
+
+    def _cascade(self, now: int) -> None:
+        shift = LEVEL_BITS[0]
+        for level, bits in zip(self.levels[1:], LEVEL_BITS[1:]):
+            index = (now >> shift) & ((1 << bits) - 1)
+            slot = level[index]
+            if slot:
+                timers = list(slot)
+                slot.clear()
+                for timer in timers:
+                    self._add(timer)
+            if index:
+                return  # the levels above only come round when this one does
+            shift += bits
@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import itemgetter
+from typing import Iterable
+
+"""
+Sorted columnar store for (timestamp, price) pairs, as used by Means to an End.
+
+    prices = TimeSeries()
+    prices.insert(12345, 101)
+    prices.mean(12000, 16000)  # 101
+
+Points live in runs: two sorted array('i') columns of timestamps and prices,
+with a prefix sum column next to them (array('q'), a million int32 prices can
+overflow 32 bits). sums[i] is the total of the first i prices, so the total of a
+range in a run is two bisects and a subtraction, whatever its size.
+
+Inserts newer than every point so far are appended to the first run as they
+come. Anything else is kept in `pending` until the next query, which sorts it
+into a new run, then merges the last two runs while the newer one is at least
+half the size of the older one. Merging two sorted runs is one timsort pass in
+C, and the runs grow geometrically, so there are only log2(n) of them to bisect
+and every point takes part in log2(n) merges at most, however the client orders
+its inserts.
+
+As with the dict it replaces, inserting a timestamp twice keeps the last price.
+
+timeseries_backend("numpy") swaps in NumpyTimeSeries (timeseries_numpy.py), for
+bulk loads followed by bursts of queries, when NumPy is installed.
+"""
+
+
+class Run:
+    __slots__ = ("times", "prices", "sums", "stale")
+
+    def __init__(self, times: array, prices: array):
+        self.times = times
+        self.prices = prices
+        self.sums = array("q", accumulate(prices, initial=0))
+        self.stale: int | None = None  # first row whose prefix sum is out of date
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple[int, int]]) -> "Run":
+        """Build a run from (timestamp, price) rows sorted by timestamp."""
+        times = array("i", map(itemgetter(0), rows))
+        return cls(times, array("i", map(itemgetter(1), rows)))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def append(self, timestamp: int, price: int) -> None:
+        self.times.append(timestamp)
+        self.prices.append(price)
+        if self.stale is None:
+            self.sums.append(self.sums[-1] + price)
+
+    def replace(self, i: int, price: int) -> None:
+        self.prices[i] = price
+        if self.stale is None or i < self.stale:
+            self.stale = i
+
+    def total(self, mintime: int, maxtime: int) -> tuple[int, int]:
+        """Sum and number of the prices in mintime <= timestamp <= maxtime."""
+        if self.stale is not None:
+            self.resum()
+        lo = bisect_left(self.times, mintime)
+        hi = bisect_right(self.times, maxtime, lo)
+        return self.sums[hi] - self.sums[lo], hi - lo
+
+    def resum(self) -> None:
+        first, sums = self.stale, self.sums
+        del sums[first + 1 :]
+        running = accumulate(self.prices[first:], initial=sums[first])
+        next(running)
+        sums.extend(running)
+        self.stale = None
+
+
+def merge(older: Run, newer: Run) -> Run:
+    # two sorted runs with distinct timestamps, timsort merges them in one pass
+    rows = list(zip(older.times, older.prices))
+    rows.extend(zip(newer.times, newer.prices))
+    rows.sort(key=itemgetter(0))
+    return Run.from_rows(rows)
+
+
+class TimeSeries:
+    __slots__ = ("runs", "pending", "last")
+
+    def __init__(self):
+        self.runs = [Run(array("i"), array("i"))]  # largest first
+        self.pending: dict[int, int] = {}  # timestamp -> price, not in a run yet
+        self.last: int | None = None  # newest timestamp so far
+
+    def __len__(self) -> int:
+        return sum(map(len, self.runs)) + len(self.pending)
+
+    def insert(self, timestamp: int, price: int) -> None:
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+            self.runs[0].append(timestamp, price)
+        elif timestamp in self.pending:
+            self.pending[timestamp] = price
+        else:
+            for run in self.runs:
+                times = run.times
+                i = bisect_left(times, timestamp)
+                if i < len(times) and times[i] == timestamp:
+                    run.replace(i, price)
+                    return
+            self.pending[timestamp] = price
+
+    def mean(self, mintime: int, maxtime: int) -> int:
+        """Mean price over mintime <= timestamp <= maxtime, truncated, 0 if empty."""
+        if self.pending:
+            self._flush()
+        if mintime > maxtime:
+            return 0
+
+        total = count = 0
+        for run in self.runs:
+            run_total, run_count = run.total(mintime, maxtime)
+            total += run_total
+            count += run_count
+        if not count:
+            return 0
+
+        # exact integer division, rounded towards zero like int(total / count)
+        mean = abs(total) // count
+        return mean if total >= 0 else -mean
+
+    def means(self, ranges: Iterable[tuple[int, int]]) -> list[int]:
+        """mean() for each (mintime, maxtime)."""
+        return [self.mean(mintime, maxtime) for mintime, maxtime in ranges]
+
+    def _flush(self) -> None:
+        rows = sorted(self.pending.items())
+        self.pending.clear()
+        runs = self.runs
+        runs.append(Run.from_rows(rows))
+        while len(runs) > 1 and len(runs[-1]) * 2 >= len(runs[-2]):
+            newer = runs.pop()
+            runs[-1] = merge(runs[-1], newer)
+
+
+def timeseries_backend(name: str = "python") -> type:
+    """The TimeSeries class for `name`, pure Python if NumPy isn't installed."""
+    if name == "python":
+        return TimeSeries
+    if name != "numpy":
+        raise ValueError(f"Unknown timeseries backend: {name}")
+
+    try:
+        from .timeseries_numpy import NumpyTimeSeries
+    except ImportError:
+        return TimeSeries
+    return NumpyTimeSeries
@@ -0,0 +1,73 @@
+from typing import Iterable
+
+import numpy as np
+
+INITIAL_BUFFER = 1024
+ROW = np.dtype([("time", "<i4"), ("price", "<i4")])
+
+"""
+NumPy backend for TimeSeries, picked with timeseries_backend("numpy").
+
+Built for bulk loads: millions of inserts, then bursts of queries. Inserts are
+written into a preallocated structured array, which doubles when full. The
+first query after them sorts the buffer into the points in one stable argsort,
+drops all but the last price of a repeated timestamp, and takes a fresh cumsum.
+A burst of queries is then answered by means() with two searchsorted calls over
+the whole batch.
+
+Every merge sorts all the points again, so a client that interleaves single
+inserts and queries is better off with the pure Python TimeSeries.
+"""
+
+
+class NumpyTimeSeries:
+    __slots__ = ("rows", "sums", "buffer", "buffered")
+
+    def __init__(self):
+        self.rows = np.empty(0, dtype=ROW)  # sorted by time, times are unique
+        self.sums = np.zeros(1, dtype=np.int64)  # sums[i] = total of rows[:i]
+        self.buffer = np.empty(INITIAL_BUFFER, dtype=ROW)  # inserts not merged yet
+        self.buffered = 0
+
+    def __len__(self) -> int:
+        if self.buffered:
+            self._merge()
+        return len(self.rows)
+
+    def insert(self, timestamp: int, price: int) -> None:
+        if self.buffered == len(self.buffer):
+            self.buffer = np.resize(self.buffer, 2 * len(self.buffer))
+        self.buffer[self.buffered] = (timestamp, price)
+        self.buffered += 1
+
+    def mean(self, mintime: int, maxtime: int) -> int:
+        """Mean price over mintime <= timestamp <= maxtime, truncated, 0 if empty."""
+        return self.means([(mintime, maxtime)])[0]
+
+    def means(self, ranges: Iterable[tuple[int, int]]) -> list[int]:
+        """mean() for each (mintime, maxtime), in one vectorized pass."""
+        if self.buffered:
+            self._merge()
+        bounds = np.array(ranges, dtype=np.int64).reshape(-1, 2)
+        times = self.rows["time"]
+        lo = np.searchsorted(times, bounds[:, 0], side="left")
+        hi = np.searchsorted(times, bounds[:, 1], side="right")
+        count = np.maximum(hi - lo, 0)  # mintime > maxtime gives hi < lo
+        total = np.where(count > 0, self.sums[hi] - self.sums[lo], 0)
+
+        # exact integer division, rounded towards zero like int(total / count)
+        mean = np.abs(total) // np.maximum(count, 1)
+        return np.where(total < 0, -mean, mean).tolist()
+
+    def _merge(self) -> None:
+        rows = np.concatenate((self.rows, self.buffer[: self.buffered]))
+        self.buffered = 0
+        # stable, so of the rows sharing a timestamp the last inserted ends up last
+        rows = rows[np.argsort(rows["time"], kind="stable")]
+        times = rows["time"]
+        last = np.empty(len(rows), dtype=bool)
+        last[:-1] = times[1:] != times[:-1]
+        last[-1:] = True
+        self.rows = rows[last]
+        self.sums = np.zeros(len(self.rows) + 1, dtype=np.int64)
+        np.cumsum(self.rows["price"], dtype=np.int64, out=self.sums[1:])
@@ -0,0 +1,227 @@
+import asyncio
+import math
+import socket
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+CONNECT_TIMEOUT = 5.0  # seconds, per address tried
+DNS_TTL = 60.0  # seconds a resolution is reused
+RATE_WINDOW = 10.0  # seconds of connections the arrival rate is measured over
+HEADROOM = 2  # warm connections per connection expected while one dials
+MAX_IDLE = 10.0  # seconds before a warm connection is closed instead of used
+
+"""
+Connections to one upstream server for proxies like Mob in the Middle.
+
+    upstream = Upstream("chat.protohackers.com", 16963, limit=256)
+    async with upstream.connection() as (reader, writer):
+        ...
+
+A proxy that dials only once its client connected makes every session wait
+for a DNS lookup and a TCP handshake before the first byte. Instead:
+
+DNS: getaddrinfo() results are cached for DNS_TTL, and dropped early if none
+    of the addresses can be dialed.
+Warm pool: connections dialed ahead of time, a session takes one and a new
+    one is dialed behind it. By Little's law the connections needed while one
+    dials are the arrival rate times the dial time, the pool keeps HEADROOM
+    times that, both measured: the rate over at most the last RATE_WINDOW, the
+    dial time as a moving average. Between min_idle and max_idle connections are
+    kept, a connection warm for longer than MAX_IDLE is replaced, the server
+    may have dropped it.
+limit: the most connections open to this upstream at once, warm ones
+    included. Sessions past it wait for one to close or for a pre-dialed one,
+    the pool only refills below it and while no session waits.
+connect_timeout: per address, the next one is tried after it.
+
+A warm connection may already hold data the server sent on connect, like a
+welcome message, the session reads it from the StreamReader as usual.
+"""
+
+
+class Upstream:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        limit: int = 256,
+        min_idle: int = 1,
+        max_idle: int = 16,
+        connect_timeout: float = CONNECT_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.limit = limit
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+
+        self.open = 0  # connections open or being dialed, warm ones included
+        self.waiters: deque[asyncio.Future] = deque()
+        self.pool: deque[tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]
+        self.pool = deque()
+        self.dialing = 0
+        self.arrivals: deque[float] = deque()
+        self.dial_time = 0.0  # seconds, moving average
+        self.addresses: list[tuple] = []
+        self.resolved_at = -math.inf
+        self.tasks: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def connection(self):
+        reader, writer = await self.connect()
+        try:
+            yield reader, writer
+        finally:
+            self.release(writer)
+
+    async def connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """A connection to the upstream, pass its writer to release() after."""
+        now = time.monotonic()
+        self.arrivals.append(now)
+        while self.pool:
+            reader, writer, dialed_at = self.pool.popleft()
+            if now - dialed_at < MAX_IDLE and not self._closed(reader, writer):
+                self.fill()
+                return reader, writer
+            self._discard(writer)
+
+        if self.open < self.limit:
+            self.open += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                # release() handed us its slot, or a pre-dial its connection
+                connection = await waiter
+            except asyncio.CancelledError:
+                if not waiter.done() or waiter.cancelled():
+                    if waiter in self.waiters:
+                        self.waiters.remove(waiter)
+                else:
+                    connection = waiter.result()
+                    if connection is None:
+                        self._free()
+                    else:
+                        self._discard(connection[1])
+                raise
+            if connection is not None:
+                self.fill()
+                return connection
+        try:
+            reader, writer = await self.dial()
+        except BaseException:
+            self._free()
+            raise
+        self.fill()
+        return reader, writer
+
+    def release(self, writer: asyncio.StreamWriter) -> None:
+        writer.close()
+        self._free()
+
+    def close(self) -> None:
+        """Close the warm connections, and don't dial new ones."""
+        self.min_idle = self.max_idle = 0
+        for task in self.tasks:
+            task.cancel()
+        while self.pool:
+            self._discard(self.pool.popleft()[1])
+
+    def fill(self) -> None:
+        """Dial in the background until the warm pool is at its target size."""
+        now = time.monotonic()
+        while self.pool and now - self.pool[0][2] >= MAX_IDLE:
+            self._discard(self.pool.popleft()[1])
+        target = self.target(now)
+        while len(self.pool) > target:
+            self._discard(self.pool.popleft()[1])
+
+        # a slot freed while sessions wait is theirs, not the pool's
+        while (
+            len(self.pool) + self.dialing < target
+            and self.open < self.limit
+            and not self.waiters
+        ):
+            self.open += 1
+            self.dialing += 1
+            task = asyncio.create_task(self._predial())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def target(self, now: float) -> int:
+        arrivals = self.arrivals
+        while arrivals and now - arrivals[0] > RATE_WINDOW:
+            arrivals.popleft()
+        if not arrivals:
+            return self.min_idle
+        # over the time the arrivals span, or a burst after a quiet spell is
+        # averaged with the quiet part of the window
+        rate = len(arrivals) / max(now - arrivals[0], 1.0)
+        wanted = math.ceil(rate * self.dial_time * HEADROOM)
+        return max(self.min_idle, min(self.max_idle, wanted))
+
+    async def resolve(self) -> list[tuple]:
+        if time.monotonic() - self.resolved_at < DNS_TTL:
+            return self.addresses
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            self.host, self.port, type=socket.SOCK_STREAM
+        )
+        self.addresses = [info[4] for info in infos]
+        self.resolved_at = time.monotonic()
+        return self.addresses
+
+    async def dial(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        start = time.monotonic()
+        error: Exception = OSError(f"{self.host} resolved to nothing")
+        for address in await self.resolve():
+            try:
+                async with asyncio.timeout(self.connect_timeout):
+                    reader, writer = await asyncio.open_connection(*address[:2])
+            except (OSError, TimeoutError) as e:
+                error = e
+                continue
+            elapsed = time.monotonic() - start
+            if self.dial_time:
+                elapsed = 0.8 * self.dial_time + 0.2 * elapsed
+            self.dial_time = elapsed
+            return reader, writer
+
+        self.resolved_at = -math.inf  # maybe the addresses moved, look them up again
+        raise error
+
+    async def _predial(self) -> None:
+        try:
+            reader, writer = await self.dial()
+        except (OSError, TimeoutError):
+            self._free()  # a session will dial on its own and see the error
+            return
+        except BaseException:
+            self._free()
+            raise
+        finally:
+            self.dialing -= 1
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result((reader, writer))
+                return
+        self.pool.append((reader, writer, time.monotonic()))
+
+    def _discard(self, writer: asyncio.StreamWriter) -> None:
+        writer.close()
+        self._free()
+
+    def _free(self) -> None:
+        # hand the slot straight to a waiting session, or give it back
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.open -= 1
+
+    @staticmethod
+    def _closed(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        return reader.at_eof() or writer.is_closing()
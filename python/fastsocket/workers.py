@@ -0,0 +1,81 @@
+import os
+import signal
+import sys
+import time
+from typing import Callable
+
+RESTART_DELAY = 1.0  # seconds, before restarting a worker that crashed right away
+
+"""
+Pre-fork worker pool used by FastTCP.run(workers=N).
+
+Every worker is a forked process that binds its own SO_REUSEPORT socket and
+runs its own event loop, the kernel spreads the incoming connections over them.
+The parent only supervises: it restarts workers that exit without being asked
+to, and forwards SIGINT/SIGTERM to all of them on shutdown.
+"""
+
+
+def supervise(target: Callable[[], None], workers: int) -> None:
+    """Run target() in `workers` forked processes until SIGINT/SIGTERM."""
+    children: dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def spawn() -> None:
+        sys.stdout.flush()  # or the child inherits and prints it again
+        pid = os.fork()
+        if pid == 0:
+            run_worker(target)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        print(f"Worker {pid} exited with {code}, restarting")
+        if time.monotonic() - started < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn()
+
+    print("bye.")
+
+
+def run_worker(target: Callable[[], None]) -> None:
+    # Ctrl-C reaches the whole process group, let the parent decide what happens
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    code = 0
+    try:
+        target()
+    except KeyboardInterrupt:
+        pass
+    except BaseException as e:
+        print(f"Worker {os.getpid()} crashed: {e!r}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
@@ -0,0 +1,44 @@
+import importlib.util
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+SCRIPT = Path(__file__).parent.parent / "03-budget-chat-socketserver.py"
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("budget_chat", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def login(port: int, name: str) -> tuple[socket.socket, BinaryIO]:
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    file = sock.makefile("rb")
+    file.readline()  # welcome
+    sock.sendall(name.encode() + b"\n")
+    file.readline()  # the room contains
+    return sock, file
+
+
+def test_long_multibyte_message():
+    chat = load_script()
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), chat.BudgetChatServer)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        alice, _ = login(port, "alice")
+        bob, bob_file = login(port, "bob")
+
+        message = "😀" * 1000  # 1000 characters, 4000 bytes
+        alice.sendall(message.encode() + b"\n")
+        assert bob_file.readline().decode() == f"[alice] {message}\n"
+        alice.close()
+        bob.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,112 @@
+import asyncio
+import socket
+
+from fastsocket.chat import WELCOME, Hub, Member, Room, Shard
+
+
+class Sink:
+    """A StreamWriter stand-in that keeps what is written."""
+
+    def __init__(self):
+        self.transport = self
+        self.written: list[bytes] = []
+        self.aborted = False
+
+    def abort(self) -> None:
+        self.aborted = True
+
+    def writelines(self, batch: list[bytes]) -> None:
+        self.written.extend(batch)
+
+    async def drain(self) -> None:
+        pass
+
+
+def test_room_presence_and_broadcast():
+    async def main():
+        room = Room()
+        alice, bob = Member("alice", Sink()), Member("bob", Sink())
+        assert room.join(alice) == b"* The room contains: \n"
+        assert room.join(bob) == b"* The room contains: alice\n"
+        room.broadcast(bob, "[bob] hi\n")
+        room.leave(alice)
+        await asyncio.sleep(0)
+        assert alice.writer.written == [
+            b"* bob has entered the room\n",
+            b"[bob] hi\n",
+        ]
+        assert bob.writer.written == [b"* alice has left the room\n"]
+        assert room.roster == "bob" and len(room) == 1
+
+    asyncio.run(main())
+
+
+def test_room_disconnects_slow_consumers():
+    async def main():
+        room = Room(slow_consumer="disconnect", outbox_size=2)
+        fast, slow = Member("fast", Sink(), 2), Member("slow", Sink(), 2)
+        room.join(fast)
+        room.join(slow)
+        await asyncio.sleep(0)
+        slow.outbox.extend([b"stuck", b"stuck"])  # not reading
+        room.broadcast(None, "hello\n")
+        assert slow.writer.aborted and room.names() == ["fast"]
+
+    asyncio.run(main())
+
+
+async def login(port: int, line: bytes) -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    assert await reader.readline() == WELCOME
+    writer.write(line)
+    return reader, writer
+
+
+async def accept(hub: Hub, listener: socket.socket) -> None:
+    # Hub.serve, minus forking the shards: this one runs in the test's loop
+    loop = asyncio.get_running_loop()
+    while True:
+        conn, _ = await loop.sock_accept(listener)
+        conn.setblocking(False)
+        asyncio.create_task(hub._login(conn))
+
+
+def test_handoff_with_large_leftovers():
+    async def main():
+        hub = Hub(shards=1)
+        hub_end, shard_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        hub_end.setblocking(False)
+        hub.channels.append(hub_end)
+        hub.handoffs.append([])
+        shard = asyncio.create_task(Shard(shard_end, "disconnect", 1024).serve())
+
+        listener = socket.create_server(("127.0.0.1", 0))
+        listener.setblocking(False)
+        port = listener.getsockname()[1]
+        server = asyncio.create_task(accept(hub, listener))
+
+        # a name line, and up to a read's worth of bytes sent right after it
+        for clients in (20, 60):
+            sessions = await asyncio.gather(
+                *(
+                    login(port, b"user%d\n" % i + b"x" * 4000)
+                    for i in range(clients)
+                )
+            )
+            for reader, _ in sessions:
+                line = await asyncio.wait_for(reader.readline(), 5)
+                assert line.startswith(b"* The room contains:")
+            for _, writer in sessions:
+                writer.close()
+
+        reader, writer = await login(port, b"late\n")
+        line = await asyncio.wait_for(reader.readline(), 5)
+        assert line.startswith(b"* The room contains:")
+        writer.close()
+
+        server.cancel()
+        shard.cancel()
+        listener.close()
+        hub_end.close()
+
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+from fastsocket.kvstore import KVStore, compact_log
+
+
+def test_sets_during_compaction_survive_the_swap(tmp_path):
+    path = str(tmp_path / "kv.log")
+    store = KVStore(path)
+    for i in range(100):
+        store.set(b"key%d" % i, b"old")
+        store.set(b"key%d" % i, b"new")
+
+    size = store.start_compaction()
+    store.set(b"key0", b"during")
+    store.set(b"later", b"during")
+    store.finish_compaction(compact_log(path, size))
+    store.set(b"key1", b"after")
+    store.close()
+
+    store = KVStore(path)
+    assert len(store) == 101
+    assert store.get(b"key0") == b"during"
+    assert store.get(b"later") == b"during"
+    assert store.get(b"key1") == b"after"
+    assert store.get(b"key2") == b"new"
+    assert store.log_bytes < size  # the overwritten pairs are gone
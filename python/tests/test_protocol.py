@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+from fastsocket import FastTCP, Struct, u8
+
+
+class A(Struct):
+    message_type: u8 = u8(0x01)
+
+    x: u8
+
+
+class B(Struct):
+    message_type: u8 = u8(0x02)
+
+    x: u8
+
+
+def echo_a(request: A) -> A:
+    return request
+
+
+def slow_echo_a(request: A) -> A:
+    # module level, so the process pool can unpickle it
+    time.sleep(0.2)
+    return request
+
+
+async def slow_async_echo_a(request: A) -> A:
+    await asyncio.sleep(0.2)
+    return request
+
+
+def echo_b(request: B) -> B:
+    return request
+
+
+async def exchange(
+    app: FastTCP, chunks: list[bytes], size: int, eof: bool = False
+) -> bytes:
+    """
+    Send chunks a moment apart, so each is its own read on the server. Returns
+    `size` bytes of responses, or with eof everything until the server closes.
+    """
+    server = await app.create_server()
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for chunk in chunks:
+            writer.write(chunk)
+            await asyncio.sleep(0.05)
+        if eof:
+            response = await asyncio.wait_for(reader.read(), 10)
+        else:
+            response = await asyncio.wait_for(reader.readexactly(size), 10)
+        writer.close()
+        return response
+    finally:
+        server.close()
+        if app.pool is not None:
+            app.pool.shutdown()
+
+
+def test_offloaded_and_sync_routes_protocol_mode():
+    app = FastTCP(port=0, mode="protocol", process_workers=1)
+    app.handler(A, executor="process")(slow_echo_a)
+    app.handler(B)(echo_b)
+
+    # B is answered inline while A is in the pool, A's response must still come
+    response = asyncio.run(exchange(app, [b"\x01\x01", b"\x02\x02"], 4))
+    assert response == b"\x01\x01\x02\x02"
+
+
+def test_mixed_routes_answer_in_order():
+    for mode in ("streams", "protocol"):
+        app = FastTCP(port=0, mode=mode)
+        app.handler(A)(slow_async_echo_a)
+        app.handler(B)(echo_b)
+
+        # B arrives while A's handler is awaiting
+        response = asyncio.run(exchange(app, [b"\x01\x01", b"\x02\x02"], 4))
+        assert response == b"\x01\x01\x02\x02", mode
+
+
+def test_unknown_tag_hook_may_return_none():
+    for mode in ("streams", "protocol"):
+        app = FastTCP(port=0, mode=mode, on_unknown_tag=lambda tag: None)
+        app.handler(A)(echo_a)
+
+        # answers what came before the unknown tag, then just disconnects
+        response = asyncio.run(exchange(app, [b"\x01\x01\x99"], 2, eof=True))
+        assert response == b"\x01\x01", mode
+
+
+def test_handler_value_error_is_not_a_parse_error(capsys):
+    def fail(request: A) -> A:
+        raise ValueError("the handler's own")
+
+    for mode in ("streams", "protocol"):
+        app = FastTCP(port=0, mode=mode)
+        app.handler(A)(fail)
+
+        asyncio.run(exchange(app, [b"\x01\x01"], 0, eof=True))
+        assert "Error parsing request" not in capsys.readouterr().out, mode
+
+
+def test_async_handler_error_closes_connection(capsys):
+    async def fail_on_zero(request: A) -> A:
+        await asyncio.sleep(0)
+        if request.x == 0:
+            raise ValueError("the handler's own")
+        return request
+
+    for mode in ("streams", "protocol"):
+        app = FastTCP(port=0, mode=mode)
+        app.handler(A)(fail_on_zero)
+
+        # the request before the failing one is answered, the one after is not
+        chunks = [b"\x01\x01\x01\x00\x01\x02"]
+        response = asyncio.run(exchange(app, chunks, 0, eof=True))
+        assert response == b"\x01\x01", mode
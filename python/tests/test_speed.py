@@ -0,0 +1,123 @@
+import random
+
+from fastsocket.speed import DAY, SpeedTracker, TicketRouter
+
+
+class EveryPair(SpeedTracker):
+    """Reports every violation found, without the one ticket per day rule."""
+
+    def _claim(self, plate: str, first: int, last: int) -> bool:
+        return True
+
+
+class Dispatcher:
+    def __init__(self):
+        self.writes: list[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.writes.append(data)
+
+
+def speeding(a: tuple[int, int], b: tuple[int, int], limit: int) -> bool:
+    (t1, m1), (t2, m2) = a, b
+    return t1 != t2 and abs(m2 - m1) / (abs(t2 - t1) / 3600) >= limit + 0.5
+
+
+def test_speed_is_clamped_to_u16():
+    tracker = SpeedTracker()
+    tracker.observe("UN1X", road=1, mile=0, timestamp=0, limit=60)
+    [violation] = tracker.observe("UN1X", road=1, mile=65535, timestamp=1, limit=60)
+    assert violation.speed == 0xFFFF
+
+
+def test_neighbours_find_what_every_pair_would():
+    rng = random.Random(1)
+    limit = 60
+    for _ in range(200):
+        sightings = {}  # timestamp -> mile, one mile per timestamp
+        for _ in range(rng.randrange(2, 12)):
+            sightings[rng.randrange(0, 2000)] = rng.randrange(0, 60)
+        observed = list(sightings.items())
+        rng.shuffle(observed)
+
+        tracker = EveryPair()
+        found = set()
+        for timestamp, mile in observed:
+            for v in tracker.observe("UN1X", 1, mile, timestamp, limit):
+                found.add(((v.timestamp1, v.mile1), (v.timestamp2, v.mile2)))
+
+        ordered = sorted(sightings.items())
+        every_pair = {
+            (a, b)
+            for i, a in enumerate(ordered)
+            for b in ordered[i + 1 :]
+            if speeding(a, b, limit)
+        }
+        neighbours = {
+            (a, b) for a, b in zip(ordered, ordered[1:]) if speeding(a, b, limit)
+        }
+        # a speeding pair further apart has a speeding pair in between
+        assert neighbours <= found <= every_pair
+        assert bool(found) == bool(every_pair)
+
+
+def test_one_ticket_per_day_across_spans():
+    tracker = SpeedTracker()
+    observe = tracker.observe
+
+    # days 0 to 2 in one ticket
+    assert not observe("UN1X", 1, 0, DAY - 100, 60)
+    [ticket] = observe("UN1X", 1, 5000, 2 * DAY + 100, 60)
+    assert (ticket.timestamp1, ticket.timestamp2) == (DAY - 100, 2 * DAY + 100)
+
+    # within day 1, already ticketed
+    assert not observe("UN1X", 2, 0, DAY + 10, 60)
+    assert not observe("UN1X", 2, 10, DAY + 110, 60)
+
+    # day 3 is free, then days 2 to 3 are both taken
+    assert not observe("UN1X", 3, 0, 3 * DAY + 10, 60)
+    assert len(observe("UN1X", 3, 10, 3 * DAY + 110, 60)) == 1
+    assert not observe("UN1X", 4, 0, 2 * DAY + 10, 60)
+    assert not observe("UN1X", 4, 3000, 3 * DAY + 10, 60)
+
+    # other cars have their own days, and days far apart their own words
+    assert observe("UN1X", 5, 0, 200 * DAY, 60) == []
+    assert len(observe("UN1X", 5, 10, 200 * DAY + 100, 60)) == 1
+    assert observe("OTH3R", 2, 0, DAY + 10, 60) == []
+    assert len(observe("OTH3R", 2, 10, DAY + 110, 60)) == 1
+
+
+def test_router_takes_dispatchers_in_turns():
+    router = TicketRouter()
+    a, b = Dispatcher(), Dispatcher()
+    router.register(a, roads=[1, 2])
+    router.register(b, roads=[1])
+
+    for ticket in (b"t0", b"t1", b"t2", b"t3"):
+        router.route(1, ticket)
+    router.route(2, b"t4")
+    assert a.writes == [b"t0", b"t2", b"t4"]
+    assert b.writes == [b"t1", b"t3"]
+
+    router.unregister(a)
+    router.route(1, b"t5")
+    router.route(1, b"t6")
+    assert b.writes[2:] == [b"t5", b"t6"]
+    assert 2 not in router.dispatchers
+
+
+def test_router_backlog_is_flushed_on_register():
+    router = TicketRouter(backlog_size=3)
+    for i in range(5):
+        router.route(7, b"t%d" % i)
+    router.route(8, b"u0")
+    assert router.dropped == 2
+
+    # the oldest were dropped, the rest arrive in one write
+    dispatcher = Dispatcher()
+    router.register(dispatcher, roads=[7, 8])
+    assert dispatcher.writes == [b"t2t3t4u0"]
+    assert not router.backlogs
+
+    router.route(7, b"t5")
+    assert dispatcher.writes[1:] == [b"t5"]
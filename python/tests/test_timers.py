@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from fastsocket.timers import TimerWheel
+
+
+class Recorder:
+    """A writer noting the tick of every write."""
+
+    def __init__(self, wheel: TimerWheel):
+        self.wheel = wheel
+        self.ticks: list[int] = []
+
+    def write(self, data: bytes) -> None:
+        self.ticks.append(self.wheel.now)
+
+
+def run_wheel(test):
+    """Run test(wheel, advance) with the loop clock in the test's hands."""
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        clock = [loop.time()]
+        loop.time = lambda: clock[0]
+        wheel = TimerWheel(tick=1.0)
+
+        def advance(ticks: int, step: int = 1) -> None:
+            # step > 1 is a late loop, one callback catching up on several ticks
+            for _ in range(0, ticks, step):
+                clock[0] += step
+                if wheel.handle is not None:
+                    wheel.handle.cancel()
+                    wheel._run()
+
+        test(wheel, advance)
+
+    asyncio.run(main())
+
+
+def test_intervals_past_the_first_level():
+    def test(wheel, advance):
+        intervals = [1, 7, 255, 256, 257, 1000, 16383, 16384, 70000]
+        recorders = {}
+        for interval in intervals:
+            recorders[interval] = Recorder(wheel)
+            wheel.every(interval, recorders[interval], b"")
+
+        advance(3000)
+        advance(150_000, step=500)
+        now = wheel.now
+        for interval, recorder in recorders.items():
+            assert recorder.ticks == list(range(interval, now + 1, interval))
+
+    run_wheel(test)
+
+
+def test_cancel_in_any_level():
+    def test(wheel, advance):
+        recorders = {}
+        timers = {}
+        for interval in (3, 300, 20000):
+            recorders[interval] = Recorder(wheel)
+            timers[interval] = wheel.every(interval, recorders[interval], b"")
+
+        advance(20500, step=50)
+        for timer in timers.values():
+            timer.cancel()
+        assert len(wheel) == 0
+        written = {i: list(recorder.ticks) for i, recorder in recorders.items()}
+
+        advance(50000, step=50)
+        assert {i: recorder.ticks for i, recorder in recorders.items()} == written
+        assert written[20000] == [20000]
+        assert wheel.handle is None  # stops ticking once empty
+
+    run_wheel(test)
+
+
+def test_interval_must_be_a_tick_or_more():
+    def test(wheel, advance):
+        with pytest.raises(ValueError):
+            wheel.every(0, Recorder(wheel), b"")
+
+    run_wheel(test)
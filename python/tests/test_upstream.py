@@ -0,0 +1,67 @@
+import asyncio
+
+from fastsocket.upstream import Upstream
+
+
+async def serve():
+    """A stand-in upstream that greets each connection and echoes lines."""
+
+    async def handle(reader, writer):
+        writer.write(b"welcome\n")
+        while line := await reader.readline():
+            writer.write(line)
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_waiting_session_gets_predialed_connection():
+    async def main():
+        server, port = await serve()
+        upstream = Upstream("127.0.0.1", port, limit=2)
+        # A dials, its fill() pre-dials the second slot, B waits for that one
+        a = await asyncio.wait_for(upstream.connect(), 2)
+        b = await asyncio.wait_for(upstream.connect(), 2)
+        assert upstream.open == 2
+        assert not upstream.pool and not upstream.waiters
+
+        for reader, writer in (a, b):
+            assert await reader.readline() == b"welcome\n"
+            writer.write(b"ping\n")
+            assert await reader.readline() == b"ping\n"
+            upstream.release(writer)
+        upstream.close()
+        server.close()
+
+    asyncio.run(main())
+
+
+def test_release_hands_slot_to_waiting_session():
+    async def main():
+        server, port = await serve()
+        upstream = Upstream("127.0.0.1", port, limit=1, min_idle=0)
+        reader, writer = await upstream.connect()
+
+        waiting = asyncio.create_task(upstream.connect())
+        await asyncio.sleep(0.05)
+        assert not waiting.done() and len(upstream.waiters) == 1
+
+        upstream.release(writer)
+        reader, writer = await asyncio.wait_for(waiting, 2)
+        assert await reader.readline() == b"welcome\n"
+        assert upstream.open == 1
+
+        # a session that gives up waiting leaves no trace
+        waiting = asyncio.create_task(upstream.connect())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert not upstream.waiters and upstream.open == 1
+
+        upstream.release(writer)
+        assert upstream.open == 0
+        upstream.close()
+        server.close()
+
+    asyncio.run(main())